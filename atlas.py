@@ -0,0 +1,191 @@
+import argparse
+import io
+import json
+import math
+import mmap
+import struct
+import time
+from typing import Callable, NamedTuple
+
+from behaviors import BehaviorEngine, load_engine
+from persistence import write_bytes_atomic
+from render import (CAT_COLORS, SPRITE_BOX, AnimationState, SpriteCache, SpriteRenderer,
+                    current_pose, pose_shapes, rasterize)
+
+# Атлас облика кота по умолчанию
+SKIN_FILE = 'cat_skin.atlas'
+
+# Начало файла атласа, за ним длина и JSON оглавления, дальше кадры PNG подряд
+MAGIC = b'CATSKIN1'
+HEADER_SIZE = struct.Struct('<I')
+
+# Сколько кадров на поведение и с какой частотой их показывать при сборке атласа
+ATLAS_FRAMES = 12
+ATLAS_FPS = 8.0
+
+# Сколько декодированных кадров держать в памяти
+SKIN_CACHE_FRAMES = 64
+
+
+class SkinFrame(NamedTuple):
+    """Ключ кадра облика"""
+    behavior: str
+    direction: int      # 1 - вправо, -1 - влево
+    index: int
+
+
+class SkinAtlas:
+    """Атлас кадров облика кота, отображённый в память
+
+    При открытии читается только оглавление: у каждого поведения частота
+    и список кадров (смещение, длина). Кадры хранятся в PNG, смотрящими
+    вправо, и декодируются по одному в image(); страницы файла, которые
+    ни разу не понадобились, в память не попадают.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, 'rb') as f:
+            try:
+                self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                raise ValueError(f"{path} пуст") from None
+        try:
+            self._read_index()
+        except (ValueError, KeyError, TypeError, struct.error) as e:
+            self.data.close()
+            raise ValueError(f"{path} не является атласом облика кота: {e}") from None
+
+    def _read_index(self) -> None:
+        data = self.data
+        if data[:len(MAGIC)] != MAGIC:
+            raise ValueError("неверная сигнатура")
+        (size,) = HEADER_SIZE.unpack_from(data, len(MAGIC))
+        base = len(MAGIC) + HEADER_SIZE.size + size
+        index = json.loads(data[len(MAGIC) + HEADER_SIZE.size:base].decode('utf-8'))
+        self.name = index['name']
+        self.box = tuple(index['box'])
+        self.animations = {}
+        for behavior, animation in index['behaviors'].items():
+            frames = tuple((base + offset, length) for offset, length in animation['frames'])
+            if not frames or any(offset + length > len(data) for offset, length in frames):
+                raise ValueError(f"кадры поведения {behavior} выходят за конец файла")
+            self.animations[behavior] = (float(animation['fps']), frames)
+        self.default = index.get('default')
+        if self.default not in self.animations:
+            self.default = next(iter(self.animations))
+
+    def resolve(self, behavior: str) -> str:
+        """Поведение, кадры которого показывать: своё или поведение по умолчанию"""
+        return behavior if behavior in self.animations else self.default
+
+    def image(self, key: SkinFrame):
+        """Декодирование кадра в изображение PIL"""
+        # PIL нужен только при первом показе кадра
+        from PIL import Image, ImageOps
+
+        offset, length = self.animations[key.behavior][1][key.index]
+        image = Image.open(io.BytesIO(self.data[offset:offset + length])).convert('RGB')
+        if key.direction != 1:
+            image = ImageOps.mirror(image)
+        return image
+
+    def close(self) -> None:
+        """Закрытие отображения файла"""
+        self.data.close()
+
+
+class SkinRenderer(SpriteRenderer):
+    """Отрисовка кота кадрами из атласа облика
+
+    Кадр выбирается по поведению и времени, а не по позе, поэтому
+    анимации облика могут быть любыми. Декодированные кадры лежат
+    в ограниченном LRU-кэше.
+    """
+    def __init__(self, canvas, atlas: SkinAtlas, max_frames: int = SKIN_CACHE_FRAMES,
+                 photo_factory=None, clock: Callable[[], float] = time.monotonic):
+        super().__init__(canvas, SpriteCache(max_frames, photo_factory, source=atlas.image))
+        self.atlas = atlas
+        self.origin = atlas.box[:2]
+        self.clock = clock
+
+    def key(self, pose) -> SkinFrame:
+        """Кадр облика для поведения позы в текущий момент"""
+        behavior = self.atlas.resolve(pose.behavior)
+        fps, frames = self.atlas.animations[behavior]
+        return SkinFrame(behavior, pose.direction, int(self.clock() * fps) % len(frames))
+
+
+def render_frames(engine: BehaviorEngine, behavior: str, colors: dict = CAT_COLORS,
+                  frames: int = ATLAS_FRAMES) -> list:
+    """Кадры одного цикла анимации нарисованного кота, смотрящего вправо
+
+    Дыхание, хвост, уши и зрачки проходят целое число периодов за цикл,
+    поэтому цикл повторяется без скачка.
+    """
+    index = engine.index[behavior]
+    images = []
+    for i in range(frames):
+        phase = 2 * math.pi * i / frames
+        animation = AnimationState(tail_angle=2 * phase, ear_angle=phase, breath_phase=phase)
+        pose = current_pose(animation, behavior, phase / 2,
+                            tail=engine.tail[index], eyes_closed=engine.eyes_closed[index])
+        images.append(rasterize(pose_shapes(pose, colors)))
+    return images
+
+
+def build_atlas(path: str, engine: BehaviorEngine, name: str = 'рыжий',
+                colors: dict = CAT_COLORS, frames: int = ATLAS_FRAMES, fps: float = ATLAS_FPS) -> None:
+    """Сборка атласа облика с кадрами всех поведений engine из нарисованного кота с цветами colors"""
+    blobs = []
+    offset = 0
+    index = {'name': name, 'box': list(SPRITE_BOX), 'default': engine.names[engine.default], 'behaviors': {}}
+    for behavior in engine.names:
+        entries = []
+        for image in render_frames(engine, behavior, colors, frames):
+            buffer = io.BytesIO()
+            image.save(buffer, 'PNG', optimize=True)
+            blob = buffer.getvalue()
+            entries.append([offset, len(blob)])
+            blobs.append(blob)
+            offset += len(blob)
+        index['behaviors'][behavior] = {'fps': fps, 'frames': entries}
+    header = json.dumps(index, ensure_ascii=False).encode('utf-8')
+    write_bytes_atomic(path, MAGIC + HEADER_SIZE.pack(len(header)) + header + b''.join(blobs))
+
+
+def main():
+    """Сборка атласа облика и вывод его оглавления"""
+    parser = argparse.ArgumentParser(description="Атлас облика кота")
+    commands = parser.add_subparsers(dest='command', required=True)
+    build = commands.add_parser('build', help="собрать атлас из нарисованного кота")
+    build.add_argument('path', nargs='?', default=SKIN_FILE, help="файл атласа")
+    build.add_argument('--name', default='рыжий', help="название облика")
+    build.add_argument('--color', action='append', default=[], metavar='ЧАСТЬ=ЦВЕТ',
+                       help=f"цвет части кота, части: {', '.join(CAT_COLORS)}")
+    build.add_argument('--frames', type=int, default=ATLAS_FRAMES, help="кадров на поведение")
+    build.add_argument('--fps', type=float, default=ATLAS_FPS, help="частота кадров анимации")
+    info = commands.add_parser('info', help="показать оглавление атласа")
+    info.add_argument('path', nargs='?', default=SKIN_FILE, help="файл атласа")
+    args = parser.parse_args()
+
+    if args.command == 'build':
+        colors = dict(CAT_COLORS)
+        for color in args.color:
+            part, _, value = color.partition('=')
+            if part not in colors or not value:
+                parser.error(f"неверный цвет: {color}")
+            colors[part] = value
+        started = time.perf_counter()
+        build_atlas(args.path, load_engine(), args.name, colors, args.frames, args.fps)
+        print(f"Атлас {args.path} собран за {time.perf_counter() - started:.2f} с")
+
+    atlas = SkinAtlas(args.path)
+    print(f"Облик '{atlas.name}', {len(atlas.data)} байт")
+    for behavior, (fps, frames) in atlas.animations.items():
+        size = sum(length for _, length in frames)
+        print(f"  {behavior}: {len(frames)} кадров, {fps:g} кадр/с, {size} байт")
+    atlas.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,180 @@
+import json
+import os
+from bisect import bisect
+from typing import Dict, NamedTuple, Optional, Tuple
+
+# Файл поведений рядом с модулем, а не в текущем каталоге
+BEHAVIORS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'behaviors.json')
+
+# Потребности и черты характера, на которые может ссылаться конфигурация
+NEEDS = ('energy', 'happiness', 'hunger')
+TRAITS = ('playfulness', 'laziness', 'curiosity', 'friendliness')
+# Режимы пониженной частоты кадров, которые поведение может включать у неподвижного кота
+FRAME_MODES = ('idle', 'sleeping')
+
+# Ширина полосы потребностей, внутри которой веса поведений не пересчитываются
+NEED_BAND = 5.0
+
+
+class Factor(NamedTuple):
+    """Множитель веса поведения"""
+    behavior: int
+    name: str           # черта характера или потребность
+    trait: bool
+    inverted: bool      # для потребности: недостающая до 100 доля
+
+
+class Override(NamedTuple):
+    """Поведение, которое включается, когда потребность выходит за порог"""
+    need: str
+    below: bool         # True: потребность < порога, False: > порога
+    threshold: float
+    behavior: int
+
+
+class BehaviorEngine:
+    """Поведения кота, собранные из конфигурации в плоские таблицы
+
+    Каждое поведение - номер в кортежах весов, длительностей, скоростей,
+    выбора цели и облика: режима кадров, размаха хвоста, закрытых глаз.
+    Множители веса - черты характера или доли потребностей. Веса
+    зависят только от личности и полос потребностей, поэтому
+    накопленные веса строятся один раз на полосу, а выбор поведения -
+    одно случайное число и бинарный поиск, сколько бы поведений ни было.
+    """
+    def __init__(self, config: dict):
+        behaviors = config['behaviors']
+        if not behaviors:
+            raise ValueError("В конфигурации нет ни одного поведения")
+        self.names = tuple(behaviors)
+        self.index = {name: i for i, name in enumerate(self.names)}
+        self.weights = tuple(float(params['weight']) for params in behaviors.values())
+        self.min_duration = tuple(float(params['duration'][0]) for params in behaviors.values())
+        self.max_duration = tuple(float(params['duration'][1]) for params in behaviors.values())
+        self.speed = tuple(float(params.get('speed', 1.0)) for params in behaviors.values())
+        self.wander = tuple(params.get('target') == 'random' for params in behaviors.values())
+        self.frame_mode = tuple(params.get('frame_mode') for params in behaviors.values())
+        self.tail = tuple(float(params.get('tail', 1.0)) for params in behaviors.values())
+        self.eyes_closed = tuple(params.get('eyes', 'open') == 'closed' for params in behaviors.values())
+        for name, params in behaviors.items():
+            if params.get('frame_mode') not in (None,) + FRAME_MODES:
+                raise ValueError(f"Неизвестный режим кадров '{params['frame_mode']}' у поведения {name}")
+            if params.get('eyes', 'open') not in ('open', 'closed'):
+                raise ValueError(f"Глаза поведения {name} должны быть 'open' или 'closed'")
+        self.default = self._behavior(config.get('default', self.names[0]))
+
+        factors = []
+        for index, params in enumerate(behaviors.values()):
+            for factor in params.get('factors', ()):
+                inverted = factor.startswith('-')
+                name = factor.lstrip('-')
+                if name in TRAITS and not inverted:
+                    factors.append(Factor(index, name, True, False))
+                elif name in NEEDS:
+                    factors.append(Factor(index, name, False, inverted))
+                else:
+                    raise ValueError(f"Неизвестный множитель '{factor}' у поведения {self.names[index]}")
+        self.factors = tuple(factors)
+        # Потребности, от которых зависят веса, - они и задают полосу
+        self.band_needs = tuple(need for need in NEEDS
+                                if any(not f.trait and f.name == need for f in self.factors))
+
+        overrides = []
+        for override in config.get('overrides', ()):
+            if override['need'] not in NEEDS:
+                raise ValueError(f"Неизвестная потребность '{override['need']}'")
+            below = 'below' in override
+            overrides.append(Override(override['need'], below,
+                                      float(override['below' if below else 'above']),
+                                      self._behavior(override['behavior'])))
+        self.overrides = tuple(overrides)
+
+        cursor = config.get('cursor')
+        if cursor is not None:
+            if cursor['trait'] not in TRAITS:
+                raise ValueError(f"Неизвестная черта характера '{cursor['trait']}'")
+            self.cursor_trait = cursor['trait']
+            self.cursor_behavior = self._behavior(cursor['behavior'])
+            self.cursor_except = frozenset(self._behavior(name) for name in cursor.get('except', ()))
+        else:
+            self.cursor_trait = self.cursor_behavior = None
+            self.cursor_except = frozenset()
+
+    def _behavior(self, name: str) -> int:
+        """Номер поведения по имени из конфигурации"""
+        try:
+            return self.index[name]
+        except KeyError:
+            raise ValueError(f"Неизвестное поведение '{name}'") from None
+
+    def duration(self, behavior: int, rng) -> float:
+        """Случайная длительность поведения"""
+        return rng.uniform(self.min_duration[behavior], self.max_duration[behavior])
+
+    def forced(self, state) -> Optional[int]:
+        """Поведение, навязанное потребностями, или None"""
+        for override in self.overrides:
+            value = getattr(state, override.need)
+            if value < override.threshold if override.below else value > override.threshold:
+                return override.behavior
+        return None
+
+    def settled(self, state, behavior: int, trends: Dict[str, int]) -> bool:
+        """Останется ли поведение навязанным, пока потребности меняются сами
+
+        trends - знак изменения каждой потребности со временем. Порог
+        не отпустит, если потребность движется дальше за него, а более
+        важные пороги не сработают, если их потребности удаляются от них.
+        """
+        for override in self.overrides:
+            value = getattr(state, override.need)
+            active = value < override.threshold if override.below else value > override.threshold
+            # Потребность, которая со временем только уходит дальше за порог
+            toward = trends.get(override.need, 0) == (-1 if override.below else 1)
+            if active:
+                return override.behavior == behavior and toward
+            if toward:
+                return False
+        return False
+
+    def band(self, state) -> Tuple[int, ...]:
+        """Номера полос потребностей, от которых зависят веса"""
+        return tuple(int(getattr(state, need) // NEED_BAND) for need in self.band_needs)
+
+    def cum_weights(self, band: Tuple[int, ...], personality) -> Tuple[list, float]:
+        """Накопленные веса поведений для полосы потребностей и их сумма"""
+        # Потребности берём по середине полосы
+        needs = {need: min(100.0, (value + 0.5) * NEED_BAND)
+                 for need, value in zip(self.band_needs, band)}
+        weights = list(self.weights)
+        for factor in self.factors:
+            if factor.trait:
+                value = getattr(personality, factor.name)
+            else:
+                value = needs[factor.name] / 100
+                if factor.inverted:
+                    value = 1 - value
+            weights[factor.behavior] *= value
+
+        total = 0.0
+        for index, weight in enumerate(weights):
+            total += weight
+            weights[index] = total
+        return weights, total
+
+    def choose(self, cum_weights: list, total: float, rng) -> int:
+        """Взвешенный выбор номера поведения"""
+        return bisect(cum_weights, rng.random() * total, 0, len(cum_weights) - 1)
+
+
+_engines = {}
+
+
+def load_engine(path: Optional[str] = None) -> BehaviorEngine:
+    """Поведения из файла конфигурации; файл читается один раз"""
+    path = os.path.abspath(path or BEHAVIORS_FILE)
+    engine = _engines.get(path)
+    if engine is None:
+        with open(path, 'r', encoding='utf-8') as f:
+            engine = _engines[path] = BehaviorEngine(json.load(f))
+    return engine
@@ -0,0 +1,411 @@
+import argparse
+import json
+import os
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import Counter
+from typing import Optional
+
+from atlas import SKIN_FILE, SkinAtlas, SkinRenderer, build_atlas
+from behaviors import load_engine
+from main import RENDERERS, DesktopPet
+from render import SpriteCache, SpriteRenderer
+from scheduler import FrameScheduler
+from simulation import BASE_DT, PERSONALITY_FILE, STATE_FILE, CatAI, ManualClock
+
+# Методы холста и окна Tk, которые вызывает кот
+CANVAS_METHODS = ('create_oval', 'create_polygon', 'create_line', 'create_image',
+                  'create_text', 'coords', 'itemconfig', 'delete', 'tag_raise',
+                  'pack', 'bind')
+WINDOW_METHODS = ('title', 'attributes', 'overrideredirect', 'config', 'geometry',
+                  'bind', 'protocol', 'destroy')
+
+
+def _recorded(name: str):
+    """Метод заглушки, который только считает вызовы"""
+    def method(self, *args, **kwargs):
+        self.calls[name] += 1
+        self.last_id += 1
+        return self.last_id
+    method.__name__ = name
+    return method
+
+
+class RecordingCanvas:
+    """Заглушка холста Tk, считающая вызовы без дисплея"""
+    def __init__(self):
+        self.calls = Counter()
+        self.last_id = 0
+
+
+class RecordingWindow:
+    """Заглушка окна Tk, считающая вызовы без дисплея"""
+    def __init__(self, screen_size=(1920, 1080), pointer=(960, 540)):
+        self.calls = Counter()
+        self.last_id = 0
+        self.screen_size = screen_size
+        self.pointer = pointer
+        self.next_delay = None
+
+    def winfo_screenwidth(self) -> int:
+        self.calls['winfo_screenwidth'] += 1
+        return self.screen_size[0]
+
+    def winfo_screenheight(self) -> int:
+        self.calls['winfo_screenheight'] += 1
+        return self.screen_size[1]
+
+    def winfo_pointerxy(self):
+        self.calls['winfo_pointerxy'] += 1
+        return self.pointer
+
+    def winfo_x(self) -> int:
+        return 0
+
+    def winfo_y(self) -> int:
+        return 0
+
+    def after(self, delay, callback=None):
+        """Запоминает задержку следующего кадра вместо планирования"""
+        self.calls['after'] += 1
+        self.next_delay = delay
+
+
+for _name in CANVAS_METHODS:
+    setattr(RecordingCanvas, _name, _recorded(_name))
+for _name in WINDOW_METHODS:
+    setattr(RecordingWindow, _name, _recorded(_name))
+
+
+_atlas_dir = None
+
+
+def benchmark_atlas() -> str:
+    """Атлас облика по умолчанию, собранный один раз за процесс во временном каталоге"""
+    global _atlas_dir
+    if _atlas_dir is None:
+        _atlas_dir = tempfile.TemporaryDirectory()
+        build_atlas(os.path.join(_atlas_dir.name, SKIN_FILE), load_engine())
+    return os.path.join(_atlas_dir.name, SKIN_FILE)
+
+
+def make_pet(renderer: str, adaptive: bool = True, max_fps: float = 30) -> DesktopPet:
+    """Кот на заглушках холста и окна с часами симуляции"""
+    clock = ManualClock(start=time.time())
+    window = RecordingWindow()
+    canvas = RecordingCanvas()
+    skin = benchmark_atlas() if renderer == 'skin' else None
+    pet = DesktopPet(renderer=renderer, max_fps=max_fps, window=window, canvas=canvas,
+                     cat_ai=CatAI(clock=clock, persistent=False), skin=skin)
+    pet.scheduler = FrameScheduler(max_fps=max_fps, clock=clock, adaptive=adaptive)
+    pet.pointer.clock = clock
+    # Без Tk кадры остаются изображениями PIL
+    if renderer == 'sprites':
+        pet.cat_renderer = SpriteRenderer(canvas, SpriteCache(photo_factory=lambda image: image))
+    elif renderer == 'skin':
+        pet.cat_renderer = SkinRenderer(canvas, SkinAtlas(skin), photo_factory=lambda image: image,
+                                        clock=clock)
+    pet.clock = clock
+    return pet
+
+
+def advance(pet: DesktopPet) -> None:
+    """Сдвиг часов кота на задержку, запрошенную прошлым кадром"""
+    delay = pet.window.next_delay
+    pet.clock.advance(delay / 1000 if delay is not None else BASE_DT)
+
+
+def _timed(samples: list, func):
+    """Обёртка, записывающая длительность каждого вызова"""
+    def wrapper(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            samples.append(time.perf_counter() - started)
+    return wrapper
+
+
+def percentiles(samples: list) -> dict:
+    """Перцентили длительностей в миллисекундах"""
+    if not samples:
+        return {}
+    ordered = sorted(samples)
+    last = len(ordered) - 1
+    return {
+        'count': len(ordered),
+        'p50': ordered[last // 2] * 1000,
+        'p95': ordered[int(last * 0.95)] * 1000,
+        'p99': ordered[int(last * 0.99)] * 1000,
+        'max': ordered[last] * 1000,
+    }
+
+
+def bench_renderer(renderer: str, frames: int, batch: int = 1) -> dict:
+    """Задержки этапов, вызовы Tk и выделения памяти на кадр"""
+    pets = [make_pet(renderer) for _ in range(batch)]
+    # Одинаковые коты рисуются одними кадрами: у пачки общий кэш
+    cache = getattr(pets[0].cat_renderer, 'cache', None)
+    if cache is not None:
+        for pet in pets[1:]:
+            pet.cat_renderer.cache = cache
+    stages = {'ai': [], 'choose': [], 'physics': [], 'draw': []}
+    for pet in pets:
+        pet.cat_ai.update = _timed(stages['ai'], pet.cat_ai.update)
+        pet.cat_ai._choose_new_behavior = _timed(stages['choose'], pet.cat_ai._choose_new_behavior)
+        pet.update_physics = _timed(stages['physics'], pet.update_physics)
+        pet.draw_cat = _timed(stages['draw'], pet.draw_cat)
+
+    # Кадр пачки - по одному кадру каждого кота
+    frame_times = []
+    for _ in range(frames):
+        started = time.perf_counter()
+        for pet in pets:
+            pet.animate()
+        frame_times.append(time.perf_counter() - started)
+        for pet in pets:
+            advance(pet)
+
+    canvas_calls = sum(sum(pet.canvas.calls.values()) for pet in pets)
+    window_moves = sum(pet.window.calls['geometry'] for pet in pets)
+    display_queries = sum(pet.window.calls[name] for pet in pets
+                          for name in ('winfo_screenwidth', 'winfo_screenheight', 'winfo_pointerxy'))
+    stage_stats = {name: percentiles(samples) for name, samples in stages.items()}
+
+    # Отдельный проход для памяти: tracemalloc замедляет код; кэш кадров к нему уже прогрет
+    if cache is not None:
+        cold = (cache.hits, cache.misses)
+    allocations = []
+    tracemalloc.start()
+    try:
+        for _ in range(min(frames, 500)):
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+            for pet in pets:
+                pet.animate()
+            allocations.append(tracemalloc.get_traced_memory()[1] - before)
+            for pet in pets:
+                advance(pet)
+    finally:
+        tracemalloc.stop()
+    allocations.sort()
+
+    result = {
+        'renderer': renderer,
+        'batch': batch,
+        'frame': percentiles(frame_times),
+        'stages': stage_stats,
+        'canvas_calls_per_frame': canvas_calls / (frames * batch),
+        'window_moves_per_frame': window_moves / (frames * batch),
+        'display_queries_per_frame': display_queries / (frames * batch),
+        'alloc_bytes_per_frame': {
+            'mean': sum(allocations) / len(allocations),
+            'p95': allocations[int((len(allocations) - 1) * 0.95)],
+        },
+    }
+    if cache is not None:
+        result['sprite_hit_rate'] = cache.hits / max(1, cache.hits + cache.misses)
+        warm_hits, warm_misses = cache.hits - cold[0], cache.misses - cold[1]
+        result['sprite_warm_hit_rate'] = warm_hits / max(1, warm_hits + warm_misses)
+        result['sprite_frames'] = len(cache.frames)
+    return result
+
+
+def bench_scheduler(adaptive: bool, seconds: float, renderer: str = 'sprites') -> dict:
+    """Частота кадров и время ЦП на секунду работы кота
+
+    Без adaptive воспроизводится прежний цикл: кадр каждые 50 мс.
+    """
+    pet = make_pet(renderer, adaptive=adaptive, max_fps=30 if adaptive else 1 / BASE_DT)
+    start = pet.clock()
+    frames = 0
+    busy = 0.0
+    modes = Counter()
+    while pet.clock() - start < seconds:
+        started = time.perf_counter()
+        pet.animate()
+        busy += time.perf_counter() - started
+        frames += 1
+        modes[pet.scheduler.mode] += 1
+        advance(pet)
+    elapsed = pet.clock() - start
+    return {
+        'scheduler': 'adaptive' if adaptive else 'fixed',
+        'fps': frames / elapsed,
+        'cpu_ms_per_second': busy / elapsed * 1000,
+        'modes': dict(modes),
+    }
+
+
+def bench_swarm(count: int, ticks: int) -> Optional[dict]:
+    """Время шага векторной стаи, если установлен NumPy"""
+    try:
+        from swarm import CatSwarm
+    except ImportError:
+        return None
+    swarm = CatSwarm(count, seed=0)
+    samples = []
+    for _ in range(ticks):
+        started = time.perf_counter()
+        swarm.tick(BASE_DT)
+        samples.append(time.perf_counter() - started)
+    return {'cats': count, 'tick': percentiles(samples)}
+
+
+# Холодный запуск в отдельном процессе: время отсчитывается от запуска
+# процесса, а заглушки окна подключаются после замера импортов
+STARTUP_SCRIPT = """
+import json, sys, time
+started = time.time()
+import main
+imported = time.time()
+from benchmark import RecordingCanvas, RecordingWindow
+from render import SpriteCache, SpriteRenderer
+fakes = time.time()
+canvas = RecordingCanvas()
+pet = main.DesktopPet(renderer=sys.argv[1], window=RecordingWindow(), canvas=canvas,
+                      cat_ai=main.CatAI())
+if sys.argv[1] == 'sprites':
+    pet.cat_renderer = SpriteRenderer(canvas, SpriteCache(photo_factory=lambda image: image))
+elif sys.argv[1] == 'skin':
+    from atlas import SkinRenderer
+    pet.cat_renderer = SkinRenderer(canvas, pet.cat_renderer.atlas, photo_factory=lambda image: image)
+created = time.time()
+pet.animate()
+drawn = time.time()
+print(json.dumps({
+    'started': started, 'imports': imported - started, 'pet': created - fakes,
+    'first_frame': drawn - created, 'drawn': drawn - (fakes - imported),
+    'heavy_modules': [name for name in ('PIL', 'pystray', 'numpy') if name in sys.modules],
+}))
+"""
+
+
+def bench_startup(renderer: str, runs: int) -> dict:
+    """Холодный запуск до первого кадра с сохранёнными состоянием и личностью
+
+    Каждый запуск - новый интерпретатор в каталоге с файлами состояния,
+    как при входе в систему. Время - медиана по запускам, миллисекунды.
+    """
+    package_dir = os.path.dirname(os.path.abspath(__file__))
+    env = dict(os.environ, PYTHONPATH=package_dir)
+    samples = []
+    with tempfile.TemporaryDirectory() as directory:
+        personality_path = os.path.join(directory, PERSONALITY_FILE)
+        with open(os.path.join(directory, STATE_FILE), 'w') as f:
+            json.dump({'energy': 80.0, 'happiness': 90.0, 'hunger': 10.0,
+                       'last_update': time.time() - 3600}, f)
+        with open(personality_path, 'w') as f:
+            json.dump({'playfulness': 0.5, 'laziness': 0.5, 'curiosity': 0.5,
+                       'friendliness': 0.5}, f)
+        personality_mtime = os.stat(personality_path).st_mtime_ns
+        if renderer == 'skin':
+            shutil.copy(benchmark_atlas(), os.path.join(directory, SKIN_FILE))
+
+        for _ in range(runs):
+            spawned = time.time()
+            output = subprocess.run([sys.executable, '-c', STARTUP_SCRIPT, renderer],
+                                    cwd=directory, env=env, capture_output=True,
+                                    text=True, check=True).stdout
+            sample = json.loads(output.strip().splitlines()[-1])
+            sample['interpreter'] = sample['started'] - spawned
+            sample['total'] = sample['drawn'] - spawned
+            samples.append(sample)
+        rewritten = os.stat(personality_path).st_mtime_ns != personality_mtime
+
+    def median(name):
+        return statistics.median(sample[name] for sample in samples) * 1000
+
+    return {
+        'renderer': renderer,
+        'runs': runs,
+        'total': median('total'),
+        'interpreter': median('interpreter'),
+        'imports': median('imports'),
+        'pet': median('pet'),
+        'first_frame': median('first_frame'),
+        'heavy_modules': samples[-1]['heavy_modules'],
+        'personality_rewritten': rewritten,
+    }
+
+
+def _format(stats: dict) -> str:
+    """Строка перцентилей для отчёта"""
+    if not stats:
+        return "нет вызовов"
+    return (f"p50 {stats['p50']:.3f}  p95 {stats['p95']:.3f}  "
+            f"p99 {stats['p99']:.3f}  max {stats['max']:.3f} мс ({stats['count']})")
+
+
+def main():
+    """Запуск замеров и вывод отчёта"""
+    parser = argparse.ArgumentParser(description="Замеры горячих путей кота без дисплея")
+    parser.add_argument('--frames', type=int, default=2000, help="кадров на замер")
+    parser.add_argument('--batch', type=int, default=100, help="котов в большой пачке")
+    parser.add_argument('--renderers', nargs='+', choices=RENDERERS, default=list(RENDERERS),
+                        help="сравниваемые способы отрисовки")
+    parser.add_argument('--seconds', type=float, default=600.0,
+                        help="длительность сравнения планировщиков в секундах симуляции")
+    parser.add_argument('--startup-runs', type=int, default=5,
+                        help="холодных запусков на способ отрисовки, 0 - не замерять")
+    parser.add_argument('--seed', type=int, default=0, help="зерно генератора случайных чисел")
+    parser.add_argument('--json', action='store_true', help="вывести результаты в JSON")
+    args = parser.parse_args()
+
+    results = {'renderers': [], 'schedulers': [], 'swarm': None, 'startup': []}
+    for renderer in args.renderers:
+        for batch in (1, args.batch):
+            random.seed(args.seed)
+            frames = args.frames if batch == 1 else max(1, args.frames // batch)
+            results['renderers'].append(bench_renderer(renderer, frames, batch))
+    for adaptive in (False, True):
+        random.seed(args.seed)
+        results['schedulers'].append(bench_scheduler(adaptive, args.seconds))
+    results['swarm'] = bench_swarm(args.batch * 10, 200)
+    if args.startup_runs > 0:
+        for renderer in args.renderers:
+            results['startup'].append(bench_startup(renderer, args.startup_runs))
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    for result in results['renderers']:
+        print(f"Отрисовка '{result['renderer']}', котов: {result['batch']}")
+        print(f"  кадр:           {_format(result['frame'])}")
+        print(f"  ИИ:             {_format(result['stages']['ai'])}")
+        print(f"  выбор поведения: {_format(result['stages']['choose'])}")
+        print(f"  физика:         {_format(result['stages']['physics'])}")
+        print(f"  отрисовка:      {_format(result['stages']['draw'])}")
+        print(f"  на кадр: вызовов холста {result['canvas_calls_per_frame']:.2f}, "
+              f"перемещений окна {result['window_moves_per_frame']:.2f}, "
+              f"запросов к дисплею {result['display_queries_per_frame']:.2f}")
+        allocated = result['alloc_bytes_per_frame']
+        print(f"  памяти на кадр: в среднем {allocated['mean'] / 1024:.1f} КиБ, "
+              f"p95 {allocated['p95'] / 1024:.1f} КиБ")
+        if 'sprite_hit_rate' in result:
+            print(f"  попаданий в кэш кадров: {result['sprite_hit_rate']:.1%}, "
+                  f"после прогрева {result['sprite_warm_hit_rate']:.1%}, кадров в кэше: {result['sprite_frames']}")
+    for result in results['schedulers']:
+        print(f"Планировщик '{result['scheduler']}': {result['fps']:.1f} кадров/с, "
+              f"{result['cpu_ms_per_second']:.2f} мс ЦП на секунду, режимы {result['modes']}")
+    if results['swarm'] is not None:
+        print(f"Стая из {results['swarm']['cats']} котов, шаг: {_format(results['swarm']['tick'])}")
+    for result in results['startup']:
+        print(f"Холодный запуск '{result['renderer']}' до первого кадра: {result['total']:.1f} мс "
+              f"(интерпретатор {result['interpreter']:.1f}, импорт {result['imports']:.1f}, "
+              f"кот {result['pet']:.1f}, кадр {result['first_frame']:.1f}; "
+              f"медиана {result['runs']} запусков)")
+        heavy = ', '.join(result['heavy_modules']) or 'нет'
+        rewritten = 'да' if result['personality_rewritten'] else 'нет'
+        print(f"  загружены PIL/pystray/numpy: {heavy}; личность перезаписана: {rewritten}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,30 @@
+import queue
+from typing import List, Tuple
+
+
+class CommandBus:
+    """Очередь команд из других потоков в цикл Tk
+
+    post() можно вызывать из любого потока, он никогда не блокируется.
+    Цикл Tk раз в кадр забирает накопившиеся команды через drain()
+    и выполняет их сам, поэтому другие потоки не трогают Tk.
+    """
+    # Сколько команд выполнять за кадр, чтобы поток команд не задержал кадр
+    MAX_PER_FRAME = 64
+
+    def __init__(self):
+        self.queue = queue.SimpleQueue()
+
+    def post(self, name: str, *args) -> None:
+        """Отправка команды в цикл Tk"""
+        self.queue.put((name, args))
+
+    def drain(self, limit: int = MAX_PER_FRAME) -> List[Tuple[str, tuple]]:
+        """Накопившиеся команды, не более limit за раз"""
+        commands = []
+        while len(commands) < limit:
+            try:
+                commands.append(self.queue.get_nowait())
+            except queue.Empty:
+                break
+        return commands
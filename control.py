@@ -0,0 +1,296 @@
+import argparse
+import asyncio
+import json
+import os
+import stat
+import sys
+import threading
+import time
+from typing import List, Optional
+
+from commands import CommandBus
+from scheduler import clamp_fps
+
+# Сокет API управления в текущем каталоге, рядом с файлами состояния
+CONTROL_SOCKET = 'cat_control.sock'
+
+# Команды API и типы их аргументов; остальные команды цикла Tk снаружи недоступны
+COMMANDS = {
+    'feed': (),
+    'pet': (),
+    'pause': (),
+    'resume': (),
+    'flush': (),
+    'set_fps': (clamp_fps,),
+    'set_behavior': (str,),
+}
+
+# Ограничения на одного клиента: команд в пакете, длина строки запроса,
+# наименьший интервал подписки на телеметрию
+MAX_BATCH = CommandBus.MAX_PER_FRAME
+MAX_LINE = 64 * 1024
+MIN_INTERVAL = 0.05
+
+
+def telemetry(pet) -> dict:
+    """Текущие потребности, поведение и статистика кадров кота
+
+    Вызывается в потоке API: читаются только отдельные значения,
+    которые потоки Tk и симуляции заменяют целиком.
+    """
+    cat_ai = pet.cat_ai
+    state = cat_ai.state
+    return {
+        'time': time.time(),
+        'behavior': cat_ai.current_behavior,
+        'paused': pet.paused,
+        'needs': {
+            'energy': state.energy,
+            'happiness': state.happiness,
+            'hunger': state.hunger,
+        },
+        'max_fps': pet.scheduler.max_fps,
+        'stats': pet.stats.snapshot(),
+    }
+
+
+def parse_batch(commands, behaviors) -> List[tuple]:
+    """Проверка пакета команд из запроса; ValueError, если хоть одна неверна
+
+    Пакет либо целиком уходит в цикл Tk, либо отклоняется целиком.
+    """
+    if not isinstance(commands, list) or not commands:
+        raise ValueError("commands должен быть непустым списком")
+    if len(commands) > MAX_BATCH:
+        raise ValueError(f"в пакете больше {MAX_BATCH} команд")
+    batch = []
+    for command in commands:
+        if isinstance(command, str):
+            command = [command]
+        if not isinstance(command, list) or not command or command[0] not in COMMANDS:
+            raise ValueError(f"неизвестная команда: {command!r}")
+        name, args = command[0], command[1:]
+        types = COMMANDS[name]
+        if len(args) != len(types):
+            raise ValueError(f"{name}: ожидается аргументов: {len(types)}")
+        try:
+            args = tuple(kind(arg) for kind, arg in zip(types, args))
+        except (TypeError, ValueError):
+            raise ValueError(f"{name}: неверные аргументы {args!r}") from None
+        if name == 'set_behavior' and args[0] not in behaviors:
+            raise ValueError(f"неизвестное поведение: {args[0]}")
+        batch.append((name, args))
+    return batch
+
+
+class ControlServer:
+    """API управления и телеметрии кота на локальном Unix-сокете
+
+    Сервер asyncio работает в своём потоке и не трогает Tk: пакет команд
+    отправляется в шину команд одной командой 'batch' и выполняется
+    в ближайшем кадре целиком, а телеметрия читается из кота напрямую.
+
+    Протокол - JSON по строке на сообщение, id запроса возвращается в ответе:
+      {"id": 1, "commands": [["feed"], ["set_fps", 60], ["set_behavior", "playing"]]}
+      {"id": 2, "telemetry": true}
+      {"id": 3, "subscribe": 0.5}       - телеметрия каждые 0.5 с до отписки
+      {"id": 4, "unsubscribe": true}
+    """
+    def __init__(self, pet, path: str = CONTROL_SOCKET):
+        self.pet = pet
+        self.path = path
+        self.loop = None
+        self.stopping = None
+        self.clients = {}          # поток записи клиента -> его задача
+        self.ready = threading.Event()
+        self.error = None
+        self.thread = threading.Thread(target=self._run, name="cat-control", daemon=True)
+
+    def start(self, timeout: Optional[float] = 5.0) -> None:
+        """Запуск сервера; ошибка запуска поднимается в вызывающем потоке"""
+        self.thread.start()
+        self.ready.wait(timeout)
+        if self.error is not None:
+            raise self.error
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """Отключение клиентов и остановка сервера"""
+        if self.loop is not None and self.stopping is not None:
+            self.loop.call_soon_threadsafe(self.stopping.set)
+        if self.thread.is_alive():
+            self.thread.join(timeout)
+
+    def _run(self) -> None:
+        """Цикл событий потока API"""
+        try:
+            asyncio.run(self._serve())
+        except Exception as e:
+            self.error = e
+        finally:
+            self.ready.set()
+
+    async def _serve(self) -> None:
+        self.loop = asyncio.get_running_loop()
+        self.stopping = asyncio.Event()
+        # Сокет, оставшийся после аварийного завершения, мешает привязке;
+        # чужой файл по этому пути не трогаем - привязка завершится ошибкой
+        _remove_socket(self.path)
+        # Управлять котом может только его владелец: сокет сразу создаётся с правами 0600
+        umask = os.umask(0o177)
+        try:
+            server = await asyncio.start_unix_server(self._client, path=self.path, limit=MAX_LINE)
+        finally:
+            os.umask(umask)
+        try:
+            self.ready.set()
+            await self.stopping.wait()
+        finally:
+            server.close()
+            # Закрытый сокет завершает чтение клиента, задачи выходят сами
+            tasks = list(self.clients.values())
+            for writer in list(self.clients):
+                writer.close()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            await server.wait_closed()
+            _remove_socket(self.path)
+
+    async def _client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """Обработка одного подключения"""
+        self.clients[writer] = asyncio.current_task()
+        subscription = None
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except ValueError:
+                    self._send(writer, {'ok': False, 'error': "слишком длинный запрос"})
+                    break
+                if not line:
+                    break
+                if not line.strip():
+                    continue
+                try:
+                    request = json.loads(line)
+                    if not isinstance(request, dict):
+                        raise ValueError("запрос должен быть объектом JSON")
+                except ValueError as e:
+                    self._send(writer, {'ok': False, 'error': f"неверный запрос: {e}"})
+                    continue
+
+                reply = {'id': request.get('id')}
+                try:
+                    if 'commands' in request:
+                        batch = parse_batch(request['commands'], self.pet.cat_ai.engine.index)
+                        self.pet.commands.post('batch', batch)
+                        reply['accepted'] = len(batch)
+                    elif request.get('telemetry'):
+                        reply['telemetry'] = telemetry(self.pet)
+                    elif 'subscribe' in request:
+                        interval = max(MIN_INTERVAL, float(request['subscribe']))
+                        if subscription is not None:
+                            subscription.cancel()
+                        subscription = asyncio.create_task(
+                            self._stream(writer, interval, request.get('id')))
+                    elif request.get('unsubscribe'):
+                        if subscription is not None:
+                            subscription.cancel()
+                            subscription = None
+                    else:
+                        raise ValueError("ожидается commands, telemetry, subscribe или unsubscribe")
+                    reply['ok'] = True
+                except (TypeError, ValueError) as e:
+                    reply.update(ok=False, error=str(e))
+                self._send(writer, reply)
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            if subscription is not None:
+                subscription.cancel()
+            self.clients.pop(writer, None)
+            writer.close()
+
+    async def _stream(self, writer: asyncio.StreamWriter, interval: float, request_id) -> None:
+        """Отправка телеметрии каждые interval секунд"""
+        try:
+            while not writer.is_closing():
+                self._send(writer, {'id': request_id, 'telemetry': telemetry(self.pet)})
+                # Медленный клиент задерживает только свою подписку
+                await writer.drain()
+                await asyncio.sleep(interval)
+        except ConnectionError:
+            pass
+
+    def _send(self, writer: asyncio.StreamWriter, message: dict) -> None:
+        writer.write(json.dumps(message, ensure_ascii=False).encode('utf-8') + b'\n')
+
+
+def _remove_socket(path: str) -> None:
+    """Удаление файла path, только если это сокет"""
+    try:
+        if stat.S_ISSOCK(os.lstat(path).st_mode):
+            os.remove(path)
+    except OSError:
+        pass
+
+
+def start_control(pet, path: str = CONTROL_SOCKET) -> None:
+    """Запуск API управления кота"""
+    if not hasattr(asyncio, 'start_unix_server'):
+        print("API управления недоступно: Unix-сокеты не поддерживаются в этой системе")
+        return
+    try:
+        server = ControlServer(pet, path)
+        server.start()
+        pet.control = server
+        print(f"API управления: {path}")
+    except Exception as e:
+        # Без API кот остаётся рабочим
+        print(f"Не удалось запустить API управления: {e}")
+
+
+async def _request(path: str, requests: List[dict], watch: Optional[float]) -> None:
+    reader, writer = await asyncio.open_unix_connection(path, limit=MAX_LINE)
+    try:
+        for request in requests:
+            writer.write(json.dumps(request).encode('utf-8') + b'\n')
+        await writer.drain()
+        replies = len(requests)
+        while watch is not None or replies:
+            line = await reader.readline()
+            if not line:
+                break
+            print(line.decode('utf-8').rstrip())
+            replies -= 1
+    finally:
+        writer.close()
+
+
+def main():
+    """Отправка команд запущенному коту и просмотр телеметрии"""
+    parser = argparse.ArgumentParser(description="Управление запущенным котом через API")
+    parser.add_argument('commands', nargs='*',
+                        help="команды пакетом, аргументы через двоеточие: feed set_fps:60")
+    parser.add_argument('--socket', default=CONTROL_SOCKET, help="путь к сокету API")
+    parser.add_argument('--watch', type=float, metavar='SECONDS', default=None,
+                        help="получать телеметрию с этим интервалом")
+    args = parser.parse_args()
+
+    requests = []
+    if args.commands:
+        requests.append({'id': 1, 'commands': [command.split(':') for command in args.commands]})
+    if args.watch is not None:
+        requests.append({'id': 2, 'subscribe': args.watch})
+    elif not requests:
+        requests.append({'id': 2, 'telemetry': True})
+    try:
+        asyncio.run(_request(args.socket, requests, args.watch))
+    except KeyboardInterrupt:
+        pass
+    except OSError as e:
+        print(f"Не удалось подключиться к коту: {e}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,112 @@
+import math
+import time
+from typing import Callable, NamedTuple, Optional, Tuple
+
+
+class ScreenGeometry:
+    """Кэш размеров экрана вместо запросов к дисплею в каждом кадре
+
+    Размеры сбрасываются при изменении размеров или отображении окна,
+    а на случай смены разрешения без событий окна - раз в ttl секунд.
+    """
+    def __init__(self, window, ttl: float = 10.0, clock: Callable[[], float] = time.monotonic):
+        self.window = window
+        self.ttl = ttl
+        self.clock = clock
+        self.cached = None
+        self.cached_at = 0.0
+        self.window_size = None
+        self.refreshes = 0
+
+        self.window.bind('<Configure>', self.on_configure, add='+')
+        self.window.bind('<Map>', lambda event: self.invalidate(), add='+')
+
+    def bounds(self) -> Tuple[int, int]:
+        """Ширина и высота экрана"""
+        now = self.clock()
+        if self.cached is None or now - self.cached_at >= self.ttl:
+            self.cached = (self.window.winfo_screenwidth(), self.window.winfo_screenheight())
+            self.cached_at = now
+            self.refreshes += 1
+        return self.cached
+
+    def invalidate(self) -> None:
+        """Сброс кэша: размеры будут перечитаны при следующем запросе"""
+        self.cached = None
+
+    def on_configure(self, event) -> None:
+        """Сброс кэша при изменении размеров окна, но не при его перемещении"""
+        # Событие приходит и от дочерних виджетов, и при каждом сдвиге окна
+        if event.widget is not self.window:
+            return
+        size = (event.width, event.height)
+        if size != self.window_size:
+            self.window_size = size
+            self.invalidate()
+
+    def pointer(self) -> Optional[Tuple[int, int]]:
+        """Положение курсора на экране или None, если курсор на другом экране"""
+        x, y = self.window.winfo_pointerxy()
+        if x < 0 or y < 0:
+            return None
+        return x, y
+
+
+class PointerSample(NamedTuple):
+    """Замер курсора за кадр"""
+    x: float
+    y: float
+    vx: float              # скорость, пикселей в секунду
+    vy: float
+    over_pet: bool         # курсор двигался над котом с прошлого кадра
+
+    def lead(self, seconds: float) -> Tuple[float, float]:
+        """Положение курсора через seconds секунд при текущей скорости"""
+        return self.x + self.vx * seconds, self.y + self.vy * seconds
+
+
+class PointerTracker:
+    """Отслеживание курсора: один замер за кадр и оценка скорости
+
+    События движения только запоминают последнее положение, поэтому
+    быстрый поток событий не нагружает цикл Tk. Если событий над котом
+    не было, положение один раз запрашивается у дисплея.
+    """
+    # Постоянная времени сглаживания скорости, секунды
+    VELOCITY_TAU = 0.1
+
+    def __init__(self, geometry: ScreenGeometry, clock: Callable[[], float] = time.monotonic):
+        self.geometry = geometry
+        self.clock = clock
+        self.pending = None
+        self.events = 0
+        self.x = None
+        self.y = None
+        self.vx = 0.0
+        self.vy = 0.0
+        self.last_time = None
+
+    def on_motion(self, event) -> None:
+        """Запоминание положения из события движения мыши"""
+        self.pending = (event.x_root, event.y_root)
+        self.events += 1
+
+    def sample(self) -> Optional[PointerSample]:
+        """Положение и скорость курсора для текущего кадра"""
+        now = self.clock()
+        pending, self.pending = self.pending, None
+        position = pending if pending is not None else self.geometry.pointer()
+        if position is None:
+            self.x = self.y = self.last_time = None
+            self.vx = self.vy = 0.0
+            return None
+
+        x, y = position
+        if self.last_time is not None and now > self.last_time:
+            dt = now - self.last_time
+            # Экспоненциальное сглаживание с учётом длины кадра
+            alpha = 1 - math.exp(-dt / self.VELOCITY_TAU)
+            self.vx += ((x - self.x) / dt - self.vx) * alpha
+            self.vy += ((y - self.y) / dt - self.vy) * alpha
+        self.x, self.y, self.last_time = x, y, now
+        return PointerSample(x, y, self.vx, self.vy, pending is not None)
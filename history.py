@@ -0,0 +1,335 @@
+import json
+import os
+import struct
+import sys
+import time
+from array import array
+from typing import Iterator, List, Optional, Sequence, Tuple
+
+from persistence import write_bytes_atomic
+
+# Файл истории потребностей
+HISTORY_FILE = 'cat_history.bin'
+MAGIC = b'CATHIST1'
+
+# Уровни истории: имя, длина интервала в секундах, сколько интервалов хранить.
+# Секундная история только в памяти, часовая и суточная пишутся в файл
+LEVELS = (
+    ('second', 1, 3600),
+    ('hour', 3600, 24 * 31),
+    ('day', 86400, 3660),
+)
+PERSISTED = ('hour', 'day')
+
+# Записи файла: таблица имён поведений (длина и JSON) или замер уровня
+NAMES_RECORD = struct.Struct('<BH')
+SAMPLE_RECORD = struct.Struct('<BdfffBI')
+NAMES = 255
+UNKNOWN_BEHAVIOR = 255
+
+# Файл сжимается при загрузке, когда записей больше, чем помещается в буферы, в COMPACT_FACTOR раз
+COMPACT_FACTOR = 2
+
+
+class RingBuffer:
+    """Кольцевой буфер замеров фиксированного размера на массивах array
+
+    Замер - время, три потребности, номер поведения и вес (сколько
+    секундных замеров в нём усреднено). Старые замеры вытесняются.
+    """
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.times = array('d', bytes(8 * capacity))
+        self.energy = array('f', bytes(4 * capacity))
+        self.happiness = array('f', bytes(4 * capacity))
+        self.hunger = array('f', bytes(4 * capacity))
+        self.behavior = array('B', bytes(capacity))
+        self.weight = array('I', bytes(4 * capacity))
+        self.start = 0
+        self.count = 0
+
+    def __len__(self) -> int:
+        return self.count
+
+    def append(self, t: float, energy: float, happiness: float, hunger: float,
+               behavior: int, weight: int = 1) -> None:
+        """Добавление замера, самый старый вытесняется"""
+        index = (self.start + self.count) % self.capacity
+        if self.count == self.capacity:
+            self.start = (self.start + 1) % self.capacity
+        else:
+            self.count += 1
+        self._set(index, t, energy, happiness, hunger, behavior, weight)
+
+    def merge_last(self, energy: float, happiness: float, hunger: float,
+                   behavior: int, weight: int) -> None:
+        """Слияние замера того же интервала с последним средним по весам"""
+        index = (self.start + self.count - 1) % self.capacity
+        old = self.weight[index]
+        total = old + weight
+        self.energy[index] = (self.energy[index] * old + energy * weight) / total
+        self.happiness[index] = (self.happiness[index] * old + happiness * weight) / total
+        self.hunger[index] = (self.hunger[index] * old + hunger * weight) / total
+        if weight > old:
+            self.behavior[index] = behavior
+        self.weight[index] = total
+
+    def _set(self, index, t, energy, happiness, hunger, behavior, weight) -> None:
+        self.times[index] = t
+        self.energy[index] = energy
+        self.happiness[index] = happiness
+        self.hunger[index] = hunger
+        self.behavior[index] = behavior
+        self.weight[index] = weight
+
+    def last_time(self) -> Optional[float]:
+        """Время последнего замера"""
+        if not self.count:
+            return None
+        return self.times[(self.start + self.count - 1) % self.capacity]
+
+    def samples(self, last: Optional[int] = None) -> Iterator[tuple]:
+        """Замеры от старых к новым: (время, энергия, радость, голод, поведение, вес)"""
+        skip = 0 if last is None else max(0, self.count - last)
+        for offset in range(skip, self.count):
+            index = (self.start + offset) % self.capacity
+            yield (self.times[index], self.energy[index], self.happiness[index],
+                   self.hunger[index], self.behavior[index], self.weight[index])
+
+
+class Downsampler:
+    """Усреднение секундных замеров по интервалам длиной period секунд"""
+    def __init__(self, period: float, behaviors: int):
+        self.period = period
+        self.bucket = None
+        self.sums = [0.0, 0.0, 0.0]
+        self.count = 0
+        self.behavior_counts = array('I', bytes(4 * behaviors))
+
+    def add(self, t: float, energy: float, happiness: float, hunger: float,
+            behavior: int) -> Optional[tuple]:
+        """Учёт замера; возвращает итог интервала, если замер начал новый"""
+        bucket = int(t // self.period)
+        done = self.take() if self.bucket is not None and bucket != self.bucket else None
+        self.bucket = bucket
+        self.sums[0] += energy
+        self.sums[1] += happiness
+        self.sums[2] += hunger
+        self.behavior_counts[behavior] += 1
+        self.count += 1
+        return done
+
+    def take(self) -> Optional[tuple]:
+        """Итог текущего интервала, даже неполного, с обнулением накопленного"""
+        if not self.count:
+            return None
+        counts = self.behavior_counts
+        behavior = max(range(len(counts)), key=counts.__getitem__)
+        count = self.count
+        done = (self.bucket * self.period, self.sums[0] / count, self.sums[1] / count,
+                self.sums[2] / count, behavior, count)
+        self.sums = [0.0, 0.0, 0.0]
+        self.count = 0
+        for index in range(len(counts)):
+            counts[index] = 0
+        return done
+
+
+class NeedHistory:
+    """История потребностей и поведения с несколькими разрешениями
+
+    Раз в секунду замер попадает в секундный буфер и в усреднители
+    часовой и суточной истории. Закрытые интервалы дописываются в конец
+    файла; при закрытии дописываются и неполные, а замеры одного
+    интервала при загрузке сливаются. Память ограничена размером буферов,
+    файл сжимается, когда в нём накапливается много лишних записей.
+    """
+    def __init__(self, behaviors: Sequence[str], path: Optional[str] = None):
+        self.behaviors = tuple(behaviors)
+        self.path = path
+        self.buffers = {name: RingBuffer(capacity) for name, _, capacity in LEVELS}
+        self.downsamplers = [(name, Downsampler(period, len(self.behaviors)))
+                             for name, period, _ in LEVELS[1:]]
+        self.next_sample = 0.0
+        self.names_written = False
+        if path is not None:
+            self.load()
+
+    def record(self, now: float, state, behavior: int) -> None:
+        """Замер потребностей, не чаще раза в секунду"""
+        if now < self.next_sample:
+            return
+        self.next_sample = now + LEVELS[0][1]
+        sample = (now, state.energy, state.happiness, state.hunger, behavior)
+        self.buffers['second'].append(*sample)
+        for level, downsampler in self.downsamplers:
+            done = downsampler.add(*sample)
+            if done is not None:
+                self._store(level, done)
+                self._append(level, done)
+
+    def _store(self, level: str, sample: tuple) -> None:
+        """Добавление замера уровня со слиянием замеров одного интервала"""
+        buffer = self.buffers[level]
+        if buffer.last_time() == sample[0]:
+            buffer.merge_last(*sample[1:])
+        else:
+            buffer.append(*sample)
+
+    def _encode(self, level: str, sample: tuple) -> bytes:
+        return SAMPLE_RECORD.pack(PERSISTED.index(level), *sample)
+
+    def _names_record(self) -> bytes:
+        names = json.dumps(self.behaviors).encode('utf-8')
+        return NAMES_RECORD.pack(NAMES, len(names)) + names
+
+    def _append(self, level: str, sample: tuple) -> None:
+        """Дописывание замера в конец файла"""
+        if self.path is None or level not in PERSISTED:
+            return
+        data = self._encode(level, sample)
+        if not self.names_written:
+            # Номера поведений в файле относятся к последней записанной таблице имён
+            data = self._names_record() + data
+        try:
+            new_file = not os.path.exists(self.path)
+            with open(self.path, 'ab') as f:
+                if new_file:
+                    f.write(MAGIC)
+                f.write(data)
+            self.names_written = True
+        except OSError as e:
+            print(f"Не удалось дописать историю кота: {e}")
+
+    def load(self, compact: bool = True) -> None:
+        """Загрузка часовой и суточной истории из файла"""
+        try:
+            with open(self.path, 'rb') as f:
+                data = f.read()
+        except FileNotFoundError:
+            return
+        except OSError as e:
+            print(f"Не удалось прочитать историю кота: {e}")
+            return
+        if data[:len(MAGIC)] != MAGIC:
+            print(f"{self.path} не является историей кота")
+            if compact:
+                self.compact()
+            return
+
+        records, end = read_records(data, self.behaviors)
+        for level, sample in records:
+            self._store(level, sample)
+
+        # Недописанный хвост сбил бы следующие записи, поэтому файл перезаписывается
+        capacity = sum(capacity for name, _, capacity in LEVELS if name in PERSISTED)
+        if compact and (end < len(data) or len(records) > COMPACT_FACTOR * capacity):
+            self.compact()
+
+    def compact(self) -> None:
+        """Перезапись файла только с тем, что помещается в буферы"""
+        parts = [MAGIC, self._names_record()]
+        for level in PERSISTED:
+            for sample in self.buffers[level].samples():
+                parts.append(self._encode(level, sample))
+        try:
+            write_bytes_atomic(self.path, b''.join(parts))
+            self.names_written = True
+        except OSError as e:
+            print(f"Не удалось сжать историю кота: {e}")
+
+    def close(self) -> None:
+        """Дописывание неполных интервалов перед выходом"""
+        for level, downsampler in self.downsamplers:
+            done = downsampler.take()
+            if done is not None:
+                self._store(level, done)
+                self._append(level, done)
+
+    def summary(self, level: str, last: Optional[int] = None) -> Optional[dict]:
+        """Средние потребности и самое частое поведение за последние интервалы"""
+        samples = list(self.buffers[level].samples(last))
+        if not samples:
+            return None
+        weight = sum(sample[5] for sample in samples)
+        behavior_weight = {}
+        for sample in samples:
+            behavior_weight[sample[4]] = behavior_weight.get(sample[4], 0) + sample[5]
+        behavior = max(behavior_weight, key=behavior_weight.get)
+        return {
+            'since': samples[0][0],
+            'samples': len(samples),
+            'energy': sum(sample[1] * sample[5] for sample in samples) / weight,
+            'happiness': sum(sample[2] * sample[5] for sample in samples) / weight,
+            'hunger': sum(sample[3] * sample[5] for sample in samples) / weight,
+            'behavior': self.behavior_name(behavior),
+        }
+
+    def behavior_name(self, behavior: int) -> str:
+        """Имя поведения по номеру"""
+        if behavior < len(self.behaviors):
+            return self.behaviors[behavior]
+        return 'неизвестно'
+
+    def format_summary(self) -> str:
+        """Тренды потребностей текстом"""
+        lines = []
+        for title, level, last in (("Последний час", 'second', None),
+                                   ("Последние сутки", 'hour', 24),
+                                   ("Последняя неделя", 'day', 7),
+                                   ("Вся история", 'day', None)):
+            summary = self.summary(level, last)
+            if summary is None:
+                continue
+            since = time.strftime('%Y-%m-%d %H:%M', time.localtime(summary['since']))
+            lines.append(f"{title} (с {since}): энергия {summary['energy']:.1f}, "
+                         f"радость {summary['happiness']:.1f}, голод {summary['hunger']:.1f}, "
+                         f"чаще всего {summary['behavior']}")
+        return '\n'.join(lines) or "История пока пуста"
+
+
+def read_records(data: bytes, behaviors: Sequence[str]) -> Tuple[List[Tuple[str, tuple]], int]:
+    """Замеры из содержимого файла истории с номерами поведений behaviors
+
+    Возвращает замеры и длину прочитанной части: она короче файла,
+    если последняя запись недописана.
+    """
+    index = {name: number for number, name in enumerate(behaviors)}
+    mapping = {}
+    records = []
+    position = len(MAGIC)
+    try:
+        while position < len(data):
+            kind = data[position]
+            if kind == NAMES:
+                _, size = NAMES_RECORD.unpack_from(data, position)
+                position += NAMES_RECORD.size
+                names = json.loads(data[position:position + size].decode('utf-8'))
+                position += size
+                mapping = {number: index.get(name, UNKNOWN_BEHAVIOR)
+                           for number, name in enumerate(names)}
+                continue
+            level, *sample = SAMPLE_RECORD.unpack_from(data, position)
+            sample[4] = mapping.get(sample[4], UNKNOWN_BEHAVIOR)
+            records.append((PERSISTED[level], tuple(sample)))
+            position += SAMPLE_RECORD.size
+    except (struct.error, ValueError, IndexError):
+        # Недописанный хвост после аварийного завершения
+        pass
+    return records, position
+
+
+def main():
+    """Вывод трендов из файла истории"""
+    from behaviors import load_engine
+
+    path = sys.argv[1] if len(sys.argv) > 1 else HISTORY_FILE
+    # Только чтение: файл не сжимается и не дописывается
+    history = NeedHistory(load_engine().names)
+    history.path = path
+    history.load(compact=False)
+    print(history.format_summary())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,133 @@
+import threading
+import time
+from array import array
+from typing import Optional
+
+# Границы корзин гистограммы в секундах: от 10 мкс, каждая следующая вдвое шире
+BUCKET_BOUNDS = tuple(0.00001 * 2 ** i for i in range(20))
+
+# Этапы кадра, время которых измеряется
+STAGES = ('ai', 'physics', 'draw', 'frame')
+
+# Сглаживание скользящих средних для оверлея
+EMA_ALPHA = 0.1
+
+
+class LatencyHistogram:
+    """Гистограмма длительностей фиксированного размера
+
+    Корзины растут в геометрической прогрессии, поэтому память не зависит
+    от числа замеров, а перцентили оцениваются с точностью до корзины.
+    """
+    def __init__(self):
+        self.counts = array('Q', [0] * (len(BUCKET_BOUNDS) + 1))
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, seconds: float) -> None:
+        """Добавление замера"""
+        index = 0
+        for bound in BUCKET_BOUNDS:
+            if seconds <= bound:
+                break
+            index += 1
+        self.counts[index] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, q: float) -> float:
+        """Оценка перцентиля сверху - граница корзины, секунды"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                if index < len(BUCKET_BOUNDS):
+                    return min(BUCKET_BOUNDS[index], self.max)
+                return self.max
+        return self.max
+
+    def mean(self) -> float:
+        """Среднее значение, секунды"""
+        return self.total / self.count if self.count else 0.0
+
+
+class FrameStats:
+    """Статистика кадров: гистограммы этапов, частота и пропуски сроков"""
+    def __init__(self, clock=time.perf_counter):
+        self.clock = clock
+        self.started = clock()
+        self.histograms = {stage: LatencyHistogram() for stage in STAGES}
+        self.recent = dict.fromkeys(STAGES, 0.0)
+        self.frame_interval = 0.0
+        self.frames = 0
+        self.missed_deadlines = 0
+        self.errors = 0
+        # Ошибки считают и поток Tk, и поток симуляции
+        self.errors_lock = threading.Lock()
+
+    def record(self, stage: str, seconds: float) -> None:
+        """Замер длительности этапа кадра"""
+        self.histograms[stage].record(seconds)
+        self.recent[stage] += (seconds - self.recent[stage]) * EMA_ALPHA
+
+    def record_frame(self, dt: float, late: bool) -> None:
+        """Учёт интервала между кадрами и опоздания кадра"""
+        self.frames += 1
+        self.frame_interval += (dt - self.frame_interval) * EMA_ALPHA
+        if late:
+            self.missed_deadlines += 1
+
+    def record_error(self) -> None:
+        """Учёт ошибки кадра или шага симуляции"""
+        with self.errors_lock:
+            self.errors += 1
+
+    def fps(self) -> float:
+        """Текущая частота кадров"""
+        return 1.0 / self.frame_interval if self.frame_interval > 0 else 0.0
+
+    def overlay_text(self) -> str:
+        """Короткий текст для оверлея на холсте"""
+        recent = self.recent
+        return (f"{self.fps():.0f} FPS  кадр {recent['frame'] * 1000:.2f} мс\n"
+                f"ИИ {recent['ai'] * 1000:.2f}  физ {recent['physics'] * 1000:.2f}  "
+                f"рис {recent['draw'] * 1000:.2f}\n"
+                f"пропусков {self.missed_deadlines}  ошибок {self.errors}")
+
+    def snapshot(self) -> dict:
+        """Снимок всей статистики в миллисекундах"""
+        stages = {}
+        for stage, histogram in self.histograms.items():
+            stages[stage] = {
+                'count': histogram.count,
+                'mean': histogram.mean() * 1000,
+                'p50': histogram.percentile(0.5) * 1000,
+                'p95': histogram.percentile(0.95) * 1000,
+                'p99': histogram.percentile(0.99) * 1000,
+                'max': histogram.max * 1000,
+            }
+        return {
+            'uptime': self.clock() - self.started,
+            'frames': self.frames,
+            'fps': self.fps(),
+            'missed_deadlines': self.missed_deadlines,
+            'errors': self.errors,
+            'stages': stages,
+        }
+
+    def format_snapshot(self, snapshot: Optional[dict] = None) -> str:
+        """Снимок статистики в виде текста"""
+        snapshot = snapshot or self.snapshot()
+        lines = [f"Кадров: {snapshot['frames']}, {snapshot['fps']:.1f} FPS, "
+                 f"пропущено сроков: {snapshot['missed_deadlines']}, ошибок: {snapshot['errors']}"]
+        for stage, stats in snapshot['stages'].items():
+            lines.append(f"  {stage}: среднее {stats['mean']:.3f}  p50 {stats['p50']:.3f}  "
+                         f"p95 {stats['p95']:.3f}  p99 {stats['p99']:.3f}  "
+                         f"max {stats['max']:.3f} мс")
+        return '\n'.join(lines)
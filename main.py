@@ -1,182 +1,82 @@
 import sys
+import argparse
 import tkinter as tk
 import random
 import time
 import math
-from PIL import Image, ImageDraw, ImageTk
-import pystray
-from dataclasses import dataclass
-from typing import Tuple, Optional
-import json
-import os
-from datetime import datetime, timedelta
-
-@dataclass
-class CatState:
-    """Класс для хранения состояния кота"""
-    energy: float = 100.0
-    happiness: float = 100.0
-    hunger: float = 0.0
-    last_update: float = time.time()
-    target_x: Optional[float] = None
-    target_y: Optional[float] = None
-    state_change_time: float = time.time()
-
-class CatPersonality:
-    """Класс для определения личности кота"""
-    def __init__(self):
-        self.playfulness = random.uniform(0.3, 1.0)
-        self.laziness = random.uniform(0.3, 1.0)
-        self.curiosity = random.uniform(0.3, 1.0)
-        self.friendliness = random.uniform(0.3, 1.0)
-        
-        # Сохраняем личность кота
-        self.save_personality()
-    
-    def save_personality(self):
-        """Сохранение личности кота в файл"""
-        data = {
-            "playfulness": self.playfulness,
-            "laziness": self.laziness,
-            "curiosity": self.curiosity,
-            "friendliness": self.friendliness
-        }
-        try:
-            with open('cat_personality.json', 'w') as f:
-                json.dump(data, f)
-        except Exception as e:
-            print(f"Не удалось сохранить личность кота: {e}")
+from typing import Callable, Optional
+from render import CAT_COLORS, AnimationState, RetainedRenderer, SpriteRenderer, current_pose, round_pose
+from atlas import SKIN_FILE, SkinAtlas, SkinRenderer
+from commands import CommandBus
+from display import PointerSample, PointerTracker, ScreenGeometry
+from history import HISTORY_FILE, NeedHistory
+from instrumentation import FrameStats
+from persistence import PersistenceWorker
+from recording import BEHAVIOR, DRAG, FEED, PAUSE, PET, RESUME, SessionRecorder
+from scheduler import FrameScheduler, clamp_fps
+from simthread import SimulationThread, interpolate
+from simulation import BASE_DT, CatAI, Kinematics, step_physics
 
-    @classmethod
-    def load_personality(cls):
-        """Загрузка личности кота из файла"""
-        try:
-            with open('cat_personality.json', 'r') as f:
-                data = json.load(f)
-                personality = cls()
-                personality.playfulness = data["playfulness"]
-                personality.laziness = data["laziness"]
-                personality.curiosity = data["curiosity"]
-                personality.friendliness = data["friendliness"]
-                return personality
-        except:
-            return cls()
-
-class CatAI:
-    """Искусственный интеллект кота"""
-    def __init__(self):
-        self.state = CatState()
-        self.personality = CatPersonality.load_personality()
-        self.current_behavior = 'idle'
-        self.behaviors = {
-            'idle': {'weight': 1.0, 'duration': (3, 8)},
-            'walking': {'weight': 0.7, 'duration': (5, 15)},
-            'playing': {'weight': 0.5, 'duration': (5, 10)},
-            'sleeping': {'weight': 0.3, 'duration': (10, 30)},
-            'hunting': {'weight': 0.4, 'duration': (3, 8)}
-        }
-        
-        # Загружаем предыдущее состояние, если есть
-        self.load_state()
+# Доступные способы отрисовки кота
+RENDERERS = ('sprites', 'retained', 'primitives', 'skin')
 
-    def save_state(self):
-        """Сохранение состояния кота"""
-        data = {
-            "energy": self.state.energy,
-            "happiness": self.state.happiness,
-            "hunger": self.state.hunger,
-            "last_update": self.state.last_update
-        }
-        try:
-            with open('cat_state.json', 'w') as f:
-                json.dump(data, f)
-        except Exception as e:
-            print(f"Не удалось сохранить состояние кота: {e}")
-
-    def load_state(self):
-        """Загрузка состояния кота"""
-        try:
-            with open('cat_state.json', 'r') as f:
-                data = json.load(f)
-                self.state.energy = data["energy"]
-                self.state.happiness = data["happiness"]
-                self.state.hunger = data["hunger"]
-                self.state.last_update = data["last_update"]
-        except:
-            pass  # Используем значения по умолчанию
-
-    def update(self, cursor_pos: Optional[Tuple[int, int]] = None) -> None:
-        """Обновление состояния кота"""
-        current_time = time.time()
-        dt = current_time - self.state.last_update
-        
-        # Обновляем характеристики с учетом времени
-        self.state.energy = max(0.0, min(100.0, self.state.energy - dt * 0.1 * self.personality.laziness))
-        self.state.hunger = min(100.0, self.state.hunger + dt * 0.15)
-        self.state.happiness = max(0.0, min(100.0, self.state.happiness - dt * 0.05))
-        
-        # Проверяем необходимость смены поведения
-        if current_time - self.state.state_change_time > self._get_behavior_duration():
-            self._choose_new_behavior(cursor_pos)
-        
-        self.state.last_update = current_time
-        
-        # Периодически сохраняем состояние
-        if random.random() < 0.01:  # 1% шанс сохранения при каждом обновлении
-            self.save_state()
-
-    def _get_behavior_duration(self) -> float:
-        """Получение длительности текущего поведения"""
-        min_dur, max_dur = self.behaviors[self.current_behavior]['duration']
-        return random.uniform(min_dur, max_dur)
-
-    def _choose_new_behavior(self, cursor_pos: Optional[Tuple[int, int]]) -> None:
-        """Выбор нового поведения кота"""
-        # Принудительные состояния на основе потребностей
-        if self.state.energy < 20:
-            new_behavior = 'sleeping'
-        elif self.state.hunger > 80:
-            new_behavior = 'hunting'
-        elif (cursor_pos and
-              random.random() < self.personality.curiosity and
-              self.current_behavior != 'sleeping'):
-            new_behavior = 'hunting'
-            self.state.target_x, self.state.target_y = cursor_pos
-        else:
-            # Вычисляем веса с учетом личности и состояния
-            weights = {}
-            for behavior, params in self.behaviors.items():
-                weight = params['weight']
-                
-                # Модифицируем веса на основе личности и состояния
-                if behavior == 'playing':
-                    weight *= self.personality.playfulness * (self.state.energy / 100)
-                elif behavior == 'sleeping':
-                    weight *= self.personality.laziness * ((100 - self.state.energy) / 100)
-                elif behavior == 'hunting':
-                    weight *= self.personality.curiosity * (self.state.hunger / 100)
-                
-                weights[behavior] = weight
-            
-            # Выбираем новое поведение
-            behaviors = list(weights.keys())
-            behavior_weights = [weights[b] for b in behaviors]
-            new_behavior = random.choices(behaviors, weights=behavior_weights)[0]
-            
-            # Определяем новую цель для движения
-            if new_behavior in ['walking', 'hunting']:
-                screen_width = 1920  # Примерная ширина экрана
-                screen_height = 1080  # Примерная высота экрана
-                self.state.target_x = random.randint(0, screen_width)
-                self.state.target_y = random.randint(0, screen_height)
-        
-        self.current_behavior = new_behavior
-        self.state.state_change_time = time.time()
+# Файл снимка статистики кадров
+STATS_FILE = 'cat_stats.json'
+# Как часто обновлять текст оверлея, секунды
+OVERLAY_INTERVAL = 0.5
+# На сколько секунд вперёд охотящийся кот упреждает курсор
+POINTER_LEAD = 0.3
+# Варианты частоты кадров в меню трея
+TRAY_FPS_CHOICES = (10, 20, 30, 60)
 
 class DesktopPet:
     """Основной класс для отображения и управления котом"""
-    def __init__(self):
-        self.window = tk.Tk()
+    def __init__(self, renderer: str = 'sprites', max_fps: float = 30,
+                 window=None, canvas=None, cat_ai: Optional[CatAI] = None,
+                 threaded: bool = False, skin: Optional[str] = None):
+        if renderer not in RENDERERS:
+            raise ValueError(f"Неизвестный способ отрисовки: {renderer}")
+        self.renderer = renderer
+        self.scheduler = FrameScheduler(max_fps=clamp_fps(max_fps))
+        
+        # Статистика кадров и оверлей с ней
+        self.stats = FrameStats()
+        self.overlay_enabled = False
+        self.overlay_item = None
+        self.overlay_text = None
+        self.overlay_updated = 0.0
+        
+        # Команды из потока трея и других потоков
+        self.commands = CommandBus()
+        self.command_handlers = {
+            'feed': self.feed_cat,
+            'pet': self.pet_cat,
+            'pause': self.pause,
+            'resume': self.resume,
+            'toggle_pause': lambda: self.resume() if self.paused else self.pause(),
+            'set_fps': self.set_fps,
+            'set_behavior': self.set_behavior,
+            'drag': self.drag_to,
+            'flush': self.flush_state,
+            'batch': self.run_batch,
+            'toggle_overlay': self.toggle_overlay,
+            'snapshot': self.dump_stats,
+            'history': self.show_history,
+            'quit': self.on_closing,
+        }
+        self.paused = False
+        self.paused_at = None
+        self.tray_icon = None
+        self.control = None
+        # Окно закрыто, следующий кадр не планируется
+        self.closed = False
+        
+        # Генератор случайных чисел и запись сеанса; запись подменяет
+        # генератор на засеянный, чтобы сеанс можно было воспроизвести
+        self.rng = random
+        self.recorder = None
+
+        self.window = window if window is not None else tk.Tk()
         self.window.title("Desktop Cat")
         self.window.attributes('-topmost', True)
         self.window.overrideredirect(True)
@@ -186,47 +86,70 @@ class DesktopPet:
         self.window.attributes('-transparentcolor', 'white')
         
         # Создаем холст
-        self.canvas = tk.Canvas(self.window, width=200, height=200,
-                              bg='white', highlightthickness=0)
+        if canvas is None:
+            canvas = tk.Canvas(self.window, width=200, height=200,
+                               bg='white', highlightthickness=0)
+        self.canvas = canvas
         self.canvas.pack()
         
+        # Размеры экрана запрашиваются у дисплея только при их изменении
+        self.geometry = ScreenGeometry(self.window)
+        self.pointer = PointerTracker(self.geometry)
+        if renderer == 'skin':
+            try:
+                self.cat_renderer = SkinRenderer(self.canvas, SkinAtlas(skin or SKIN_FILE))
+            except (OSError, ValueError) as e:
+                # Без атласа кот рисуется как обычно
+                print(f"Не удалось загрузить облик кота: {e}")
+                renderer = self.renderer = 'sprites'
+        if renderer == 'sprites':
+            self.cat_renderer = SpriteRenderer(self.canvas)
+        elif renderer == 'retained':
+            self.cat_renderer = RetainedRenderer(self.canvas)
+        elif renderer == 'primitives':
+            self.cat_renderer = None
+        # Последняя нарисованная видимая поза
+        self.drawn_pose = None
+        
         # Инициализируем ИИ кота
-        self.cat_ai = CatAI()
+        if cat_ai is None:
+            self.persistence = PersistenceWorker()
+            cat_ai = CatAI(persistence=self.persistence, screen_bounds=self.geometry.bounds)
+            cat_ai.history = NeedHistory(cat_ai.engine.names, HISTORY_FILE)
+        else:
+            self.persistence = None
+        self.cat_ai = cat_ai
+        self.cat_ai.screen_bounds = self.geometry.bounds
         
         # Анимационные параметры
-        self.animation_state = {
-            'tail_angle': 0.0,
-            'ear_angle': 0.0,
-            'eye_size': 1.0,
-            'breath_phase': 0.0,
-            'direction': 1  # 1 - вправо, -1 - влево
-        }
+        self.animation_state = AnimationState()
         
         # Физические параметры
-        self.physics = {
-            'position': [
-                random.randint(0, self.window.winfo_screenwidth() - 200),
-                random.randint(0, self.window.winfo_screenheight() - 200)
-            ],
-            'velocity': [0.0, 0.0],
-            'acceleration': [0.0, 0.0]
-        }
+        screen_width, screen_height = self.geometry.bounds()
+        self.physics = Kinematics(self.rng.randint(0, screen_width - 200),
+                                  self.rng.randint(0, screen_height - 200))
         
         # Устанавливаем начальную позицию
-        self.window.geometry(
-            f'+{int(self.physics["position"][0])}+{int(self.physics["position"][1])}'
-        )
+        self.window_position = None
+        self.dragging = False
+        # Когда поток Tk последний раз отправил перенос в поток симуляции
+        self.dragged_at = None
+        self.move_window(int(self.physics.x), int(self.physics.y))
+        
+        # Симуляция в отдельном потоке; поток Tk тогда только рисует снимки
+        self.sim_thread = None
+        if threaded:
+            self.sim_thread = SimulationThread(self)
+            self.cat_ai.screen_bounds = self.sim_thread.screen_bounds
         
         # Привязываем события
         self.setup_events()
-        
-        # Запускаем анимацию
-        self.animate()
 
     def setup_events(self):
         """Настройка обработчиков событий"""
         self.canvas.bind('<Button-1>', self.on_click)
         self.canvas.bind('<B1-Motion>', self.on_drag)
+        self.canvas.bind('<ButtonRelease-1>', self.on_release)
         self.canvas.bind('<Button-3>', self.feed_cat)
         self.canvas.bind('<Motion>', self.on_mouse_move)
         self.window.bind('<Key>', self.on_key)
@@ -234,36 +157,39 @@ class DesktopPet:
         # Обработка закрытия окна
         self.window.protocol("WM_DELETE_WINDOW", self.on_closing)
 
-    def draw_cat(self):
-        """Отрисовка кота"""
+    def draw_cat(self, animation: AnimationState, behavior: str):
+        """Отрисовка кота, если его видимая поза изменилась"""
+        engine = self.cat_ai.engine
+        index = engine.index[behavior]
+        tail, eyes_closed = engine.tail[index], engine.eyes_closed[index]
+        steps = self.cat_renderer.phase_steps if self.cat_renderer is not None else None
+        pose = current_pose(animation, behavior, time.time(), steps, tail, eyes_closed)
+        key = self.cat_renderer.key(pose) if self.cat_renderer is not None else round_pose(pose)
+        if key == self.drawn_pose:
+            return
+        self.drawn_pose = key
+        
+        if self.cat_renderer is not None:
+            self.cat_renderer.draw(key)
+            return
+
         self.canvas.delete("all")
-        
-        # Цвета
-        colors = {
-            'main': "#FF8C00",    # рыжий
-            'belly': "#FFFFFF",    # белый
-            'eye': "#FFD700",     # жёлтый
-            'nose': "#FFC0CB",    # розовый
-            'whisker': "#FFFFFF"   # белый
-        }
+        # Оверлей удалён вместе с котом и будет создан заново
+        self.overlay_item = None
+        colors = CAT_COLORS
         
         # Параметры анимации
-        breath = math.sin(self.animation_state['breath_phase']) * 3
-        tail_wave = math.sin(self.animation_state['tail_angle'])
-        
-        # Модифицируем анимацию в зависимости от состояния
-        if self.cat_ai.current_behavior == 'playing':
-            tail_wave *= 2
-        elif self.cat_ai.current_behavior == 'sleeping':
-            tail_wave *= 0.2
+        breath = math.sin(animation.breath_phase) * 3
+        # Размах хвоста зависит от поведения
+        tail_wave = math.sin(animation.tail_angle) * tail
         
         # Рисуем кота в зависимости от направления
-        if self.animation_state['direction'] == 1:
-            self._draw_cat_right(colors, breath, tail_wave)
+        if animation.direction == 1:
+            self._draw_cat_right(colors, breath, tail_wave, animation, eyes_closed)
         else:
-            self._draw_cat_left(colors, breath, tail_wave)
+            self._draw_cat_left(colors, breath, tail_wave, animation, eyes_closed)
 
-    def _draw_cat_right(self, colors, breath, tail_wave):
+    def _draw_cat_right(self, colors, breath, tail_wave, animation, eyes_closed):
         """Отрисовка кота, смотрящего вправо"""
         # Тело
         self.canvas.create_oval(70, 100 + breath, 
@@ -280,7 +206,7 @@ class DesktopPet:
                               fill=colors['main'], outline=colors['main'])
         
         # Уши с анимацией
-        ear_twitch = math.sin(self.animation_state['ear_angle']) * 5
+        ear_twitch = math.sin(animation.ear_angle) * 5
         self.canvas.create_polygon(
             70 - ear_twitch, 60,
             85, 80,
@@ -295,8 +221,8 @@ class DesktopPet:
         )
         
         # Глаза и зрачки
-        if self.cat_ai.current_behavior != 'sleeping':
-            eye_h = 8 * self.animation_state['eye_size']
+        if not eyes_closed:
+            eye_h = 8 * animation.eye_size
             
             # Левый глаз
             self.canvas.create_oval(75, 85 - eye_h/2,
@@ -325,7 +251,7 @@ class DesktopPet:
                                  fill=colors['nose'])
         
         # Усы
-        whisker_move = math.sin(self.animation_state['breath_phase']) * 2
+        whisker_move = math.sin(animation.breath_phase) * 2
         for i in range(3):
             # Левые усы
             self.canvas.create_line(70, 90 + i*5,
@@ -344,7 +270,7 @@ class DesktopPet:
                               fill=colors['main'], width=10,
                               smooth=True)
 
-    def _draw_cat_left(self, colors, breath, tail_wave):
+    def _draw_cat_left(self, colors, breath, tail_wave, animation, eyes_closed):
         """Отрисовка кота, смотрящего влево"""
         # Отзеркаливаем все x-координаты относительно центра (100)
         # Тело
@@ -362,7 +288,7 @@ class DesktopPet:
                               fill=colors['main'], outline=colors['main'])
         
         # Уши с анимацией
-        ear_twitch = math.sin(self.animation_state['ear_angle']) * 5
+        ear_twitch = math.sin(animation.ear_angle) * 5
         self.canvas.create_polygon(
             130 + ear_twitch, 60,
             115, 80,
@@ -377,8 +303,8 @@ class DesktopPet:
         )
         
         # Глаза и зрачки
-        if self.cat_ai.current_behavior != 'sleeping':
-            eye_h = 8 * self.animation_state['eye_size']
+        if not eyes_closed:
+            eye_h = 8 * animation.eye_size
             
             # Левый глаз
             self.canvas.create_oval(125, 85 - eye_h/2,
@@ -407,7 +333,7 @@ class DesktopPet:
                                  fill=colors['nose'])
         
         # Усы
-        whisker_move = math.sin(self.animation_state['breath_phase']) * 2
+        whisker_move = math.sin(animation.breath_phase) * 2
         for i in range(3):
             # Левые усы
             self.canvas.create_line(130, 90 + i*5,
@@ -426,55 +352,53 @@ class DesktopPet:
                               fill=colors['main'], width=10,
                               smooth=True)
 
-    def update_physics(self):
+    def update_physics(self, dt: float = BASE_DT):
         """Обновление физики движения кота"""
-        dt = 0.05  # Временной шаг
-        
-        if self.cat_ai.state.target_x is not None and self.cat_ai.state.target_y is not None:
-            # Вычисляем вектор к цели
-            dx = self.cat_ai.state.target_x - self.physics['position'][0]
-            dy = self.cat_ai.state.target_y - self.physics['position'][1]
-            distance = math.sqrt(dx*dx + dy*dy)
-            
-            if distance > 5:  # Если достаточно далеко от цели
-                # Нормализуем направление
-                dx /= distance
-                dy /= distance
-                
-                # Задаем ускорение
-                speed = 2.0 if self.cat_ai.current_behavior == 'hunting' else 1.0
-                self.physics['acceleration'][0] = dx * speed
-                self.physics['acceleration'][1] = dy * speed
-                
-                # Обновляем направление кота
-                self.animation_state['direction'] = 1 if dx > 0 else -1
-            else:
-                self.physics['acceleration'] = [0.0, 0.0]
-                self.cat_ai.state.target_x = None
-                self.cat_ai.state.target_y = None
-        
-        # Применяем физику
-        for i in range(2):
-            # Обновляем скорость
-            self.physics['velocity'][i] += self.physics['acceleration'][i] * dt
-            # Добавляем трение
-            self.physics['velocity'][i] *= 0.95
-            # Обновляем позицию
-            self.physics['position'][i] += self.physics['velocity'][i]
-        
-        # Проверяем границы экрана
-        self.physics['position'][0] = max(0, min(self.physics['position'][0],
-                                               self.window.winfo_screenwidth() - 200))
-        self.physics['position'][1] = max(0, min(self.physics['position'][1],
-                                               self.window.winfo_screenheight() - 200))
-        
-        # Обновляем позицию окна
-        self.window.geometry(f'+{int(self.physics["position"][0])}+{int(self.physics["position"][1])}')
+        direction = step_physics(self.physics, self.cat_ai, dt, self.cat_ai.screen_bounds())
+        if direction is not None:
+            self.animation_state.direction = direction
+
+    def move_window(self, x: int, y: int):
+        """Перемещение окна, если его позиция на экране изменилась"""
+        if (x, y) == self.window_position:
+            return
+        self.window_position = (x, y)
+        self.window.geometry(f'+{x}+{y}')
+
+    def frame_mode(self) -> str:
+        """Режим частоты кадров по текущему поведению и движению кота"""
+        physics = self.physics
+        moving = (self.cat_ai.state.target_x is not None or
+                  abs(physics.vx) + abs(physics.vy) > 0.05)
+        mode = self.cat_ai.engine.frame_mode[self.cat_ai.behavior_index]
+        if not moving and mode is not None:
+            return mode
+        return 'active'
 
     def on_click(self, event):
         """Обработка клика мыши"""
         self.drag_x = event.x
         self.drag_y = event.y
+        self.dragging = True
+        self.pet_cat()
+
+    def on_release(self, event):
+        """Окончание перетаскивания"""
+        self.dragging = False
+
+    def _forward(self, name: str, *args) -> bool:
+        """Передача действия в поток симуляции, если он есть и вызов не из него"""
+        if self.sim_thread is None or self.sim_thread.is_current():
+            return False
+        self.sim_thread.post(name, *args)
+        return True
+
+    def pet_cat(self):
+        """Поглаживание кота"""
+        if self._forward('pet'):
+            return
+        if self.recorder is not None:
+            self.recorder.event(PET)
         # Повышаем радость кота при поглаживании
         self.cat_ai.state.happiness = min(100, self.cat_ai.state.happiness + 10)
         print(f"Погладили котика! Радость: {self.cat_ai.state.happiness:.1f}")
@@ -483,108 +407,383 @@ class DesktopPet:
         """Обработка перетаскивания"""
         new_x = self.window.winfo_x() + (event.x - self.drag_x)
         new_y = self.window.winfo_y() + (event.y - self.drag_y)
-        self.physics['position'] = [float(new_x), float(new_y)]
-        self.window.geometry(f'+{int(new_x)}+{int(new_y)}')
+        self.drag_to(int(new_x), int(new_y))
+
+    def drag_to(self, x: int, y: int):
+        """Перенос кота в точку экрана"""
+        if self._forward('drag', x, y):
+            self.dragged_at = self.sim_thread.clock()
+        else:
+            if self.recorder is not None:
+                self.recorder.event(DRAG, (x, y))
+            self.physics.x = float(x)
+            self.physics.y = float(y)
+        # Окно двигает только поток Tk, не дожидаясь шага симуляции
+        if self.sim_thread is None or not self.sim_thread.is_current():
+            self.move_window(x, y)
 
-    def feed_cat(self, event):
+    def feed_cat(self, event=None):
         """Кормление кота"""
+        if self._forward('feed'):
+            return
+        if self.recorder is not None:
+            self.recorder.event(FEED)
         self.cat_ai.state.hunger = max(0, self.cat_ai.state.hunger - 30)
         self.cat_ai.state.happiness = min(100, self.cat_ai.state.happiness + 10)
         print(f"Покормили котика! Голод: {self.cat_ai.state.hunger:.1f}")
 
     def on_mouse_move(self, event):
-        """Обработка движения мыши"""
-        screen_x = self.window.winfo_x() + event.x
-        screen_y = self.window.winfo_y() + event.y
-        if self.cat_ai.current_behavior == 'hunting':
-            self.cat_ai.state.target_x = screen_x
-            self.cat_ai.state.target_y = screen_y
+        """Обработка движения мыши: событие только запоминается до кадра"""
+        self.pointer.on_motion(event)
 
     def on_key(self, event):
         """Обработка нажатий клавиш"""
         if event.char == 'q':
             self.on_closing()
 
+    def process_commands(self):
+        """Выполнение команд, накопившихся с прошлого кадра"""
+        self.run_batch(self.commands.drain())
+
+    def run_batch(self, commands):
+        """Выполнение списка команд (имя, аргументы) подряд в одном кадре"""
+        for name, args in commands:
+            handler = self.command_handlers.get(name)
+            if handler is None:
+                print(f"Неизвестная команда: {name}")
+                continue
+            handler(*args)
+
+    def pause(self):
+        """Остановка симуляции кота"""
+        if self._forward('pause'):
+            return
+        if not self.paused:
+            if self.recorder is not None:
+                self.recorder.event(PAUSE)
+            self.paused = True
+            self.paused_at = self.cat_ai.clock()
+
+    def resume(self):
+        """Продолжение симуляции без учёта времени паузы"""
+        if self._forward('resume'):
+            return
+        if self.paused:
+            if self.recorder is not None:
+                self.recorder.event(RESUME)
+            self.paused = False
+            self.cat_ai.shift_time(self.cat_ai.clock() - self.paused_at)
+
+    def set_fps(self, max_fps: float):
+        """Изменение наибольшей частоты кадров"""
+        self.scheduler.max_fps = clamp_fps(max_fps)
+
+    def set_behavior(self, behavior: str):
+        """Смена поведения кота по команде"""
+        if self._forward('set_behavior', behavior):
+            return
+        if behavior not in self.cat_ai.engine.index:
+            print(f"Неизвестное поведение: {behavior}")
+            return
+        if self.recorder is not None:
+            self.recorder.event(BEHAVIOR, self.cat_ai.engine.index[behavior])
+        self.cat_ai.set_behavior(behavior)
+
+    def flush_state(self):
+        """Сохранение состояния и личности без ожидания записи"""
+        if self._forward('flush'):
+            return
+        self.cat_ai.save_state()
+        self.cat_ai.personality.save_personality()
+        if self.persistence is not None:
+            self.persistence.request_flush()
+
+    def toggle_overlay(self):
+        """Включение и выключение оверлея со статистикой"""
+        self.overlay_enabled = not self.overlay_enabled
+
+    def show_history(self):
+        """Вывод трендов потребностей"""
+        if self.cat_ai.history is None:
+            print("История потребностей не ведётся")
+            return
+        print(self.cat_ai.history.format_summary())
+
     def on_closing(self):
         """Обработка закрытия приложения"""
+        if self.control is not None:
+            self.control.stop(timeout=1.0)
+        if self.sim_thread is not None:
+            self.sim_thread.stop(timeout=1.0)
+        if self.cat_ai.history is not None:
+            self.cat_ai.history.close()
         self.cat_ai.save_state()
+        self.cat_ai.personality.save_personality()
+        # Дожидаемся записи всех несохранённых изменений
+        if self.persistence is not None:
+            self.persistence.stop(timeout=2.0)
+        if self.recorder is not None:
+            self.recorder.close()
+        if self.tray_icon is not None:
+            self.tray_icon.stop()
+        self.closed = True
         self.window.destroy()
         sys.exit()
     
-    def run(self):
-        """Запуск приложения"""
+    def run(self, after_first_frame: Optional[Callable[[], None]] = None):
+        """Запуск приложения
+
+        after_first_frame вызывается в цикле Tk, когда первый кадр уже
+        на экране, - туда откладывается всё, без чего кот может появиться.
+        """
         try:
+            if self.sim_thread is not None:
+                self.sim_thread.start()
+            # Запускаем анимацию
+            self.animate()
+            if after_first_frame is not None:
+                # Сначала показываем окно с первым кадром
+                self.window.update_idletasks()
+                self.window.after_idle(after_first_frame)
             self.window.mainloop()
         except Exception as e:
             print(f"Ошибка в главном цикле: {e}")
             self.on_closing()
 
     def animate(self):
-        """Главный цикл анимации"""
+        """Главный цикл анимации
+
+        Следующий кадр планируется и после ошибки: иначе цикл Tk
+        останавливается, а с ним и команды трея и API из шины команд.
+        """
+        mode = None
         try:
-            # Обновляем ИИ кота
-            cursor_pos = None
-            if self.window.winfo_pointerxy():
-                cursor_pos = self.window.winfo_pointerxy()
-            self.cat_ai.update(cursor_pos)
-            
-            # Обновляем физику
-            self.update_physics()
+            # Команды из других потоков выполняются только здесь, в потоке Tk
+            self.process_commands()
+            if self.paused:
+                self.scheduler.begin_frame()
+                mode = 'paused'
+                return
             
-            # Обновляем анимационные параметры
-            self.animation_state['tail_angle'] += 0.2
-            self.animation_state['breath_phase'] += 0.1
+            # Реальное время, прошедшее с прошлого кадра
+            dt = self.scheduler.begin_frame()
+            self.stats.record_frame(dt, self.scheduler.late)
+            pointer = self.pointer.sample()
             
-            # Случайные движения ушами
-            if random.random() < 0.02:
-                self.animation_state['ear_angle'] = random.random() * math.pi
-            
-            # Моргание
-            if random.random() < 0.01:
-                self.animation_state['eye_size'] = 0.2
+            if self.sim_thread is not None:
+                self.sim_thread.post_pointer(pointer, self.geometry.bounds())
+                mode = self.render_snapshot()
             else:
-                self.animation_state['eye_size'] = min(1.0, self.animation_state['eye_size'] + 0.2)
-            
-            # Отрисовка кота
-            self.draw_cat()
-            
-            # Следующий кадр
-            self.window.after(50, self.animate)
+                self.step(dt, pointer)
+                mode = self.frame_mode()
+            self.update_overlay()
             
         except Exception as e:
+            self.stats.record_error()
             print(f"Ошибка в анимации: {e}")
+        finally:
+            # Следующий кадр; режим неизвестен, если кадр прервался раньше
+            if not self.closed:
+                self.window.after(self.scheduler.next_delay(mode or 'active'), self.animate)
+
+    def step(self, dt: float, pointer: Optional[PointerSample]):
+        """Кадр симуляции и отрисовки по длительности и замеру курсора
+
+        Всё, что зависит от дисплея и реального времени, собирает animate(),
+        поэтому запись сеанса воспроизводится вызовами step().
+        """
+        started = time.perf_counter()
+        self.simulate(dt, pointer)
+        simulated = time.perf_counter()
+        
+        # Двигаем окно, только когда сменилась целая позиция;
+        # дробная часть копится в physics
+        self.move_window(int(self.physics.x), int(self.physics.y))
+        self.draw_cat(self.animation_state, self.cat_ai.current_behavior)
+        drawn = time.perf_counter()
+        
+        self.stats.record('draw', drawn - simulated)
+        self.stats.record('frame', drawn - started)
+
+    def render_snapshot(self) -> str:
+        """Отрисовка последнего снимка потока симуляции, возвращает режим кадров"""
+        started = time.perf_counter()
+        previous, latest = self.sim_thread.snapshots.read()
+        settled = True
+        if self.dragged_at is not None:
+            settled = latest.time >= self.dragged_at
+            # Снимок до переноса не должен тянуть кота по экрану обратно
+            if previous is not None and previous.time < self.dragged_at:
+                previous = None
+        snapshot = interpolate(previous, latest, started)
+        # Во время перетаскивания окно ведёт мышь, а не симуляция; после него
+        # окно стоит, пока поток симуляции не применит последний перенос
+        if not self.dragging and settled:
+            self.move_window(int(snapshot.x), int(snapshot.y))
+        self.draw_cat(snapshot.animation, snapshot.behavior)
+        drawn = time.perf_counter()
+        
+        self.stats.record('draw', drawn - started)
+        self.stats.record('frame', drawn - started)
+        return snapshot.mode
 
-def create_tray_icon():
+    def simulate(self, dt: float, pointer: Optional[PointerSample]):
+        """Шаг ИИ, физики и фаз анимации без обращения к Tk
+
+        Выполняется в потоке Tk из step() или в потоке симуляции.
+        """
+        if self.recorder is not None:
+            self.recorder.frame(dt, pointer)
+        started = time.perf_counter()
+        frames = dt / BASE_DT
+        
+        # Обновляем ИИ кота
+        cursor_pos = (pointer.x, pointer.y) if pointer is not None else None
+        self.cat_ai.update(cursor_pos)
+        
+        # Охотящийся кот бежит туда, где курсор будет, а не где он был
+        if (pointer is not None and pointer.over_pet and
+                self.cat_ai.behavior_index == self.cat_ai.engine.cursor_behavior):
+            self.cat_ai.state.target_x, self.cat_ai.state.target_y = \
+                self.cat_ai.clamp_target(*pointer.lead(POINTER_LEAD))
+        ai_done = time.perf_counter()
+        
+        # Обновляем физику
+        self.update_physics(dt)
+        physics_done = time.perf_counter()
+        
+        # Обновляем анимационные параметры
+        self.animation_state.tail_angle += 0.2 * frames
+        self.animation_state.breath_phase += 0.1 * frames
+        
+        # Случайные движения ушами (вероятности заданы на базовый кадр)
+        if self.rng.random() < 1 - 0.98 ** frames:
+            self.animation_state.ear_angle = self.rng.random() * math.pi
+        
+        # Моргание
+        if self.rng.random() < 1 - 0.99 ** frames:
+            self.animation_state.eye_size = 0.2
+        else:
+            self.animation_state.eye_size = min(1.0, self.animation_state.eye_size + 0.2 * frames)
+        
+        # Замеры этапов
+        self.stats.record('ai', ai_done - started)
+        self.stats.record('physics', physics_done - ai_done)
+
+    def update_overlay(self):
+        """Обновление оверлея с частотой кадров и задержками"""
+        if not self.overlay_enabled:
+            if self.overlay_item is not None:
+                self.canvas.delete(self.overlay_item)
+                self.overlay_item = None
+            return
+        
+        # Текст обновляем не чаще OVERLAY_INTERVAL, чтобы его можно было прочитать
+        now = time.perf_counter()
+        if self.overlay_text is None or now - self.overlay_updated >= OVERLAY_INTERVAL:
+            self.overlay_text = self.stats.overlay_text()
+            self.overlay_updated = now
+            if self.overlay_item is not None:
+                self.canvas.itemconfig(self.overlay_item, text=self.overlay_text)
+        
+        if self.overlay_item is None:
+            self.overlay_item = self.canvas.create_text(
+                4, 4, anchor='nw', text=self.overlay_text,
+                fill="black", font=('TkFixedFont', 7)
+            )
+
+    def dump_stats(self):
+        """Вывод и сохранение снимка статистики кадров"""
+        snapshot = self.stats.snapshot()
+        print(self.stats.format_snapshot(snapshot))
+        if self.persistence is not None:
+            self.persistence.submit(STATS_FILE, snapshot)
+
+def create_tray_icon(pet: DesktopPet):
     """Создание иконки в трее"""
+    # pystray подключается к дисплею при импорте
+    import pystray
+    from PIL import Image, ImageDraw
+
     def create_icon(width, height, color="#FF8C00"):
         image = Image.new('RGBA', (width, height), (0, 0, 0, 0))
         dc = ImageDraw.Draw(image)
         dc.ellipse([4, 4, width-4, height-4], fill=color)
         return image
 
-    def quit_window(icon):
-        icon.stop()
-        sys.exit()
+    # Меню работает в потоке трея: оно только отправляет команды циклу Tk
+    def command(name, *args):
+        return lambda icon, item: pet.commands.post(name, *args)
+
+    def fps_item(fps):
+        return pystray.MenuItem(f'{fps} FPS', command('set_fps', fps), radio=True,
+                                checked=lambda item: pet.scheduler.max_fps == fps)
 
     menu = (
-        pystray.MenuItem('Выход', quit_window),
+        pystray.MenuItem('Покормить', command('feed')),
+        pystray.MenuItem('Пауза', command('toggle_pause'),
+                         checked=lambda item: pet.paused),
+        pystray.MenuItem('Частота кадров', pystray.Menu(
+            *(fps_item(fps) for fps in TRAY_FPS_CHOICES)
+        )),
+        pystray.MenuItem('Сохранить состояние', command('flush')),
+        pystray.MenuItem('Показать FPS', command('toggle_overlay'),
+                         checked=lambda item: pet.overlay_enabled),
+        pystray.MenuItem('Снимок статистики', command('snapshot')),
+        pystray.MenuItem('История потребностей', command('history')),
+        pystray.MenuItem('Выход', command('quit')),
     )
     
     icon = pystray.Icon("name", create_icon(32, 32), "Desktop Cat", menu)
     return icon
 
+def start_tray(pet: DesktopPet):
+    """Запуск иконки в трее в отдельном потоке"""
+    try:
+        icon = create_tray_icon(pet)
+        pet.tray_icon = icon
+        icon.run_detached()
+    except Exception as e:
+        # Без трея кот остаётся рабочим: выход по клавише q
+        print(f"Не удалось создать иконку в трее: {e}")
+
+
 def main():
     """Основная функция запуска приложения"""
+    parser = argparse.ArgumentParser(description="Desktop Cat")
+    parser.add_argument('--renderer', choices=RENDERERS, default='sprites',
+                        help="способ отрисовки кота")
+    parser.add_argument('--fps', type=float, default=30,
+                        help="наибольшая частота кадров")
+    parser.add_argument('--skin', metavar='PATH', default=None,
+                        help=f"атлас облика для --renderer skin (по умолчанию {SKIN_FILE}, "
+                             f"собирается через atlas.py build)")
+    parser.add_argument('--threaded', action='store_true',
+                        help="симуляция в отдельном потоке, поток Tk только рисует")
+    parser.add_argument('--record', metavar='PATH', default=None,
+                        help="записать сеанс для воспроизведения через recording.py")
+    parser.add_argument('--seed', type=int, default=None,
+                        help="зерно генератора случайных чисел для записи")
+    # Путь по умолчанию совпадает с control.CONTROL_SOCKET: asyncio грузится только с --control
+    parser.add_argument('--control', metavar='PATH', nargs='?', const='cat_control.sock', default=None,
+                        help="API управления и телеметрии на Unix-сокете (по умолчанию cat_control.sock)")
+    args = parser.parse_args()
+
     try:
         # Создаем и запускаем приложение
-        icon = create_tray_icon()
-        pet = DesktopPet()
-        
-        # Запускаем иконку в трее в отдельном потоке
-        icon.run_detached()
-        
-        # Запускаем основное окно
-        pet.run()
+        pet = DesktopPet(renderer=args.renderer, max_fps=args.fps, threaded=args.threaded,
+                         skin=args.skin)
+        if args.record:
+            SessionRecorder(args.record, seed=args.seed).attach(pet)
+        
+        def after_first_frame():
+            start_tray(pet)
+            if args.control:
+                from control import start_control
+                start_control(pet, args.control)
+        
+        # Запускаем основное окно; трей и API - после первого кадра
+        pet.run(after_first_frame=after_first_frame)
         
     except Exception as e:
         print(f"Критическая ошибка: {e}")
@@ -0,0 +1,115 @@
+import json
+import os
+import tempfile
+import threading
+import time
+from typing import Callable, Optional
+
+
+def write_json_atomic(path: str, data: dict) -> None:
+    """Атомарная запись JSON: во временный файл рядом и переименование
+
+    При сбое на диске остаётся либо старая, либо новая версия файла,
+    но никогда не обрезанная.
+    """
+    write_bytes_atomic(path, json.dumps(data).encode('utf-8'))
+
+
+def write_bytes_atomic(path: str, data: bytes) -> None:
+    """Атомарная запись байтов тем же способом, что write_json_atomic"""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, temp_path = tempfile.mkstemp(prefix='.' + os.path.basename(path), suffix='.tmp',
+                                     dir=directory)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, path)
+    except BaseException:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        raise
+
+
+class PersistenceWorker:
+    """Фоновая отложенная запись файлов состояния
+
+    submit() только запоминает последние данные для файла и сразу
+    возвращается, поэтому поток интерфейса не ждёт диска. Поток записи
+    объединяет повторные изменения одного файла и пишет их, когда
+    с первого несохранённого изменения прошло interval секунд или
+    накопилось max_updates изменений, а также по request_flush().
+    """
+    def __init__(self, interval: float = 10.0, max_updates: int = 50,
+                 clock: Callable[[], float] = time.monotonic):
+        self.interval = interval
+        self.max_updates = max_updates
+        self.clock = clock
+
+        self.condition = threading.Condition()
+        self.pending = {}        # путь -> последние данные
+        self.updates = 0
+        self.dirty_since = None
+        self.flush_requested = False
+        self.stopped = False
+
+        self.thread = threading.Thread(target=self._run, name="cat-persistence", daemon=True)
+        self.thread.start()
+
+    def submit(self, path: str, data: dict) -> None:
+        """Постановка данных файла в очередь на запись"""
+        with self.condition:
+            first = not self.pending
+            if first:
+                self.dirty_since = self.clock()
+            self.pending[path] = data
+            self.updates += 1
+            # Будим поток, чтобы он начал отсчёт интервала или записал сразу
+            if first or self.updates >= self.max_updates:
+                self.condition.notify_all()
+
+    def request_flush(self) -> None:
+        """Немедленная запись всех изменений без ожидания"""
+        with self.condition:
+            self.flush_requested = True
+            self.condition.notify_all()
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """Запись оставшихся изменений и остановка потока"""
+        with self.condition:
+            self.stopped = True
+            self.condition.notify_all()
+        self.thread.join(timeout)
+
+    def _due(self) -> bool:
+        """Пора ли записывать накопленные изменения"""
+        if not self.pending:
+            return False
+        return (self.flush_requested or self.stopped or
+                self.updates >= self.max_updates or
+                self.clock() - self.dirty_since >= self.interval)
+
+    def _run(self) -> None:
+        """Цикл потока записи"""
+        while True:
+            with self.condition:
+                while not self._due():
+                    if not self.pending:
+                        self.flush_requested = False
+                        if self.stopped:
+                            return
+                        self.condition.wait()
+                    else:
+                        self.condition.wait(self.interval - (self.clock() - self.dirty_since))
+                batch, self.pending = self.pending, {}
+                self.updates = 0
+                self.dirty_since = None
+
+            for path, data in batch.items():
+                try:
+                    write_json_atomic(path, data)
+                except Exception as e:
+                    print(f"Не удалось сохранить {path}: {e}")
@@ -0,0 +1,246 @@
+import argparse
+import json
+import random
+import struct
+import time
+from typing import Iterator, Optional, Tuple
+
+from display import PointerSample
+from simulation import ManualClock
+
+# Начало файла записи, за ним длина и JSON исходного состояния кота
+MAGIC = b'CATREC02'
+HEADER_SIZE = struct.Struct('<I')
+
+# Виды записей
+FRAME, FRAME_POINTER, PET, FEED, DRAG, PAUSE, RESUME, BEHAVIOR = range(8)
+
+# Каждая запись начинается с вида и показания часов кота,
+# дальше идут данные, зависящие от вида
+RECORD = struct.Struct('<Bd')
+FRAME_DT = struct.Struct('<d')
+POINTER = struct.Struct('<iidd?')
+POSITION = struct.Struct('<ii')
+BEHAVIOR_INDEX = struct.Struct('<H')
+
+
+class SessionRecorder:
+    """Запись сеанса кота в компактный двоичный журнал
+
+    При подключении к коту записывается его исходное состояние и зерно,
+    которым засевается новый генератор случайных чисел кота. Часы ИИ
+    замораживаются и сдвигаются только записью кадра или события, поэтому
+    журнал содержит все показания часов, которые видела симуляция.
+    """
+    def __init__(self, path: str, seed: Optional[int] = None):
+        self.path = path
+        self.seed = random.randrange(2 ** 63) if seed is None else seed
+        self.file = None
+        self.clock = None
+        self.source = None
+        self.frames = 0
+        self.events = 0
+
+    def attach(self, pet) -> None:
+        """Начало записи сеанса кота pet"""
+        cat_ai = pet.cat_ai
+        self.source = cat_ai.clock
+        self.clock = ManualClock(self.source())
+        cat_ai.clock = self.clock
+        pet.rng = cat_ai.rng = random.Random(self.seed)
+
+        header = json.dumps(snapshot(pet, self.seed, self.clock.now)).encode('utf-8')
+        self.file = open(self.path, 'wb')
+        self.file.write(MAGIC)
+        self.file.write(HEADER_SIZE.pack(len(header)))
+        self.file.write(header)
+        pet.recorder = self
+
+    def _sample(self, kind: int) -> None:
+        """Показание часов для новой записи"""
+        self.clock.now = self.source()
+        self.file.write(RECORD.pack(kind, self.clock.now))
+
+    def frame(self, dt: float, pointer: Optional[PointerSample]) -> None:
+        """Запись кадра: длительность и замер курсора"""
+        self._sample(FRAME if pointer is None else FRAME_POINTER)
+        self.file.write(FRAME_DT.pack(dt))
+        if pointer is not None:
+            self.file.write(POINTER.pack(int(pointer.x), int(pointer.y),
+                                         pointer.vx, pointer.vy, pointer.over_pet))
+        self.frames += 1
+
+    def event(self, kind: int, payload=None) -> None:
+        """Запись действия пользователя: для DRAG payload - позиция, для BEHAVIOR - номер поведения"""
+        self._sample(kind)
+        if kind == DRAG:
+            self.file.write(POSITION.pack(*payload))
+        elif kind == BEHAVIOR:
+            self.file.write(BEHAVIOR_INDEX.pack(payload))
+        self.events += 1
+
+    def close(self) -> None:
+        """Завершение записи"""
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+
+def snapshot(pet, seed: int, now: float) -> dict:
+    """Исходное состояние кота для заголовка журнала"""
+    cat_ai = pet.cat_ai
+    personality = cat_ai.personality
+    return {
+        'seed': seed,
+        'time': now,
+        'renderer': pet.renderer,
+        'screen': list(pet.geometry.bounds()),
+        'personality': {
+            'playfulness': personality.playfulness,
+            'laziness': personality.laziness,
+            'curiosity': personality.curiosity,
+            'friendliness': personality.friendliness,
+        },
+        'state': cat_ai.state.snapshot(),
+        'behavior': cat_ai.current_behavior,
+        'behavior_deadline': cat_ai.behavior_deadline,
+        'physics': pet.physics.snapshot(),
+        'animation': pet.animation_state.snapshot(),
+    }
+
+
+def restore(pet, header: dict) -> ManualClock:
+    """Перенос исходного состояния из заголовка журнала в кота
+
+    Возвращает часы, которые replay() двигает по показаниям журнала.
+    """
+    cat_ai = pet.cat_ai
+    clock = ManualClock(header['time'])
+    cat_ai.clock = clock
+    pet.rng = cat_ai.rng = random.Random(header['seed'])
+
+    for name, value in header['personality'].items():
+        setattr(cat_ai.personality, name, value)
+    cat_ai.state.restore(header['state'])
+    # Устаревшие таймеры не влияют на симуляцию, достаточно таймера поведения
+    cat_ai.current_behavior = header['behavior']
+    cat_ai.behavior_index = cat_ai.engine.index[header['behavior']]
+    cat_ai.behavior_deadline = header['behavior_deadline']
+    cat_ai.timers = []
+    cat_ai.behavior_timer = cat_ai.schedule(cat_ai.behavior_deadline, 'behavior_end')
+    cat_ai.weight_tables = {}
+
+    pet.physics.restore(header['physics'])
+    pet.animation_state.restore(header['animation'])
+    pet.window.screen_size = tuple(header['screen'])
+    pet.geometry.invalidate()
+    return clock
+
+
+def read_log(path: str) -> Tuple[dict, Iterator[tuple]]:
+    """Заголовок журнала и итератор записей (вид, время, данные)"""
+    with open(path, 'rb') as f:
+        data = f.read()
+    if data[:len(MAGIC)] != MAGIC:
+        raise ValueError(f"{path} не является записью сеанса кота")
+    offset = len(MAGIC)
+    (size,) = HEADER_SIZE.unpack_from(data, offset)
+    offset += HEADER_SIZE.size
+    header = json.loads(data[offset:offset + size].decode('utf-8'))
+    offset += size
+
+    def records():
+        position = offset
+        try:
+            while position < len(data):
+                kind, at = RECORD.unpack_from(data, position)
+                position += RECORD.size
+                payload = None
+                if kind in (FRAME, FRAME_POINTER):
+                    (dt,) = FRAME_DT.unpack_from(data, position)
+                    position += FRAME_DT.size
+                    pointer = None
+                    if kind == FRAME_POINTER:
+                        pointer = PointerSample(*POINTER.unpack_from(data, position))
+                        position += POINTER.size
+                    payload = (dt, pointer)
+                elif kind == DRAG:
+                    payload = POSITION.unpack_from(data, position)
+                    position += POSITION.size
+                elif kind == BEHAVIOR:
+                    (payload,) = BEHAVIOR_INDEX.unpack_from(data, position)
+                    position += BEHAVIOR_INDEX.size
+                yield kind, at, payload
+        except struct.error:
+            # Недописанная последняя запись после аварийного завершения
+            return
+
+    return header, records()
+
+
+def replay(path: str, renderer: Optional[str] = None):
+    """Прогон записанного сеанса без дисплея с наибольшей скоростью
+
+    Возвращает кота после последнего кадра журнала.
+    """
+    # Заглушки холста и окна из бенчмарка; импорт здесь, чтобы запись
+    # в обычном запуске не тянула бенчмарк
+    from benchmark import make_pet
+
+    header, records = read_log(path)
+    pet = make_pet(renderer or header['renderer'])
+    clock = restore(pet, header)
+
+    for kind, at, payload in records:
+        clock.now = at
+        if kind in (FRAME, FRAME_POINTER):
+            pet.stats.record_frame(payload[0], False)
+            pet.step(*payload)
+        elif kind == PET:
+            pet.pet_cat()
+        elif kind == FEED:
+            pet.feed_cat()
+        elif kind == DRAG:
+            pet.drag_to(*payload)
+        elif kind == PAUSE:
+            pet.pause()
+        elif kind == RESUME:
+            pet.resume()
+        elif kind == BEHAVIOR:
+            pet.set_behavior(pet.cat_ai.engine.names[payload])
+    return pet
+
+
+def main():
+    """Воспроизведение записи сеанса с итоговым состоянием и статистикой"""
+    parser = argparse.ArgumentParser(description="Воспроизведение записи сеанса кота")
+    parser.add_argument('path', help="файл записи, сделанной main.py --record")
+    parser.add_argument('--renderer', default=None,
+                        help="способ отрисовки; по умолчанию тот же, что при записи")
+    parser.add_argument('--profile', action='store_true', help="профилировать воспроизведение")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    if args.profile:
+        import cProfile
+        import pstats
+        profiler = cProfile.Profile()
+        pet = profiler.runcall(replay, args.path, args.renderer)
+    else:
+        pet = replay(args.path, args.renderer)
+    elapsed = time.perf_counter() - started
+
+    header, _ = read_log(args.path)
+    state = pet.cat_ai.state
+    recorded = pet.cat_ai.clock() - header['time']
+    print(f"Воспроизведено {pet.stats.frames} кадров ({recorded:.1f} с записи) за {elapsed:.2f} с")
+    print(f"Поведение: {pet.cat_ai.current_behavior}, энергия: {state.energy:.3f}, "
+          f"голод: {state.hunger:.3f}, радость: {state.happiness:.3f}")
+    print(f"Позиция: {pet.physics.x:.3f}, {pet.physics.y:.3f}")
+    print(pet.stats.format_snapshot())
+    if args.profile:
+        pstats.Stats(profiler).sort_stats('cumulative').print_stats(15)
+
+
+if __name__ == '__main__':
+    main()
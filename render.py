@@ -0,0 +1,351 @@
+import math
+from collections import OrderedDict
+from typing import NamedTuple, Optional, Tuple
+
+from simulation import SlotState
+
+# Размер холста кота
+CANVAS_SIZE = 200
+
+# Цвета кота
+CAT_COLORS = {
+    'main': "#FF8C00",    # рыжий
+    'belly': "#FFFFFF",    # белый
+    'eye': "#FFD700",     # жёлтый
+    'nose': "#FFC0CB",    # розовый
+    'whisker': "#FFFFFF"   # белый
+}
+
+# Область холста, которую занимает кот (хвост, уши, усы)
+SPRITE_BOX = (0, 50, CANVAS_SIZE, 170)
+
+
+class Pose(NamedTuple):
+    """Параметры позы кота в пикселях холста"""
+    direction: int      # 1 - вправо, -1 - влево
+    behavior: str
+    breath: float       # смещение тела при дыхании
+    tail: float         # смещение кончика хвоста
+    ear_twitch: float   # подёргивание ушей
+    eye_height: float   # высота открытых глаз, 0 - глаза закрыты
+    pupil_dy: float     # смещение зрачков
+
+
+class AnimationState(SlotState):
+    """Фазы анимации кота, из которых строится поза"""
+    __slots__ = ('tail_angle', 'ear_angle', 'eye_size', 'breath_phase', 'direction')
+
+    def __init__(self, tail_angle: float = 0.0, ear_angle: float = 0.0, eye_size: float = 1.0,
+                 breath_phase: float = 0.0, direction: int = 1):
+        self.tail_angle = tail_angle
+        self.ear_angle = ear_angle
+        self.eye_size = eye_size
+        self.breath_phase = breath_phase
+        self.direction = direction  # 1 - вправо, -1 - влево
+
+
+def snap_phase(phase: float, steps: int) -> float:
+    """Фаза, сведённая к одному из steps положений за цикл"""
+    step = 2 * math.pi / steps
+    return round(phase / step) % steps * step
+
+
+def current_pose(animation: AnimationState, behavior: str, now: float,
+                 phase_steps: Optional[int] = None, tail: float = 1.0,
+                 eyes_closed: bool = False) -> Pose:
+    """Поза кота по анимационным параметрам
+
+    tail и eyes_closed - размах хвоста и закрытые глаза поведения
+    из его описания в BehaviorEngine.
+
+    С phase_steps фазы дыхания и хвоста проходят за цикл по phase_steps
+    положений, а зрачки идут в такт дыханию - так поз конечное число,
+    и их кадры помещаются в кэш.
+    """
+    tail_angle = animation.tail_angle
+    breath_phase = animation.breath_phase
+    pupil_phase = now * 2
+    if phase_steps:
+        # Зрачки и так движутся с частотой дыхания
+        breath_phase = snap_phase(breath_phase, phase_steps)
+        tail_angle = snap_phase(tail_angle, phase_steps)
+        pupil_phase = breath_phase
+    return Pose(
+        direction=animation.direction,
+        behavior=behavior,
+        breath=math.sin(breath_phase) * 3,
+        tail=math.sin(tail_angle) * tail * 20,
+        ear_twitch=math.sin(animation.ear_angle) * 5,
+        eye_height=0.0 if eyes_closed else 8 * animation.eye_size,
+        pupil_dy=0.0 if eyes_closed else math.sin(pupil_phase) * 2,
+    )
+
+
+# Положений фаз дыхания и хвоста за цикл у кадров из кэша: при 20 кадрах/с
+# хвост сменяет положение почти каждый кадр, дыхание - каждые 2-3 кадра
+PHASE_STEPS = 24
+# Столько кадров из кэша набирается у одного кота за все поведения,
+# около 100 КиБ изображения Tk на кадр
+SPRITE_CACHE_FRAMES = 384
+# Уши и глаза кадров из кэша: уши опущены или подняты, глаза прищурены или открыты
+EAR_STEP = 5
+EYE_LEVELS = (2, 8)
+
+
+def quantize_pose(pose: Pose) -> Pose:
+    """Поза, сведённая к небольшому набору кадров, - ключ кэша кадров
+
+    Ожидает позу с фазами, сведёнными через current_pose(..., PHASE_STEPS);
+    уши и глаза сводятся к двум состояниям здесь.
+    """
+    eye_height = pose.eye_height
+    if eye_height > 0:
+        eye_height = min(EYE_LEVELS, key=lambda level: abs(level - eye_height))
+    return pose._replace(
+        # Поведение видно только по хвосту и глазам, кадры разных поведений общие
+        behavior='',
+        breath=round(pose.breath * 2) / 2,
+        tail=round(pose.tail * 2) / 2,
+        ear_twitch=round(pose.ear_twitch / EAR_STEP) * EAR_STEP,
+        eye_height=eye_height,
+        pupil_dy=round(pose.pupil_dy * 2) / 2,
+    )
+
+
+def round_pose(pose: Pose) -> Pose:
+    """Поза, округлённая до целых пикселей холста"""
+    return pose._replace(
+        breath=round(pose.breath),
+        tail=round(pose.tail),
+        ear_twitch=round(pose.ear_twitch),
+        eye_height=round(pose.eye_height),
+        pupil_dy=round(pose.pupil_dy),
+    )
+
+
+def cat_shapes(pose: Pose, colors: dict = CAT_COLORS) -> list:
+    """Описание фигур кота, смотрящего вправо, для заданной позы
+
+    Каждая фигура - кортеж (имя, тип, координаты, параметры) с семантикой
+    параметров Tk: у овала по умолчанию чёрный контур, у многоугольника
+    контура нет, линия по умолчанию чёрная. Набор имён зависит только
+    от того, открыты ли глаза.
+    """
+    breath = pose.breath
+    ear_twitch = pose.ear_twitch
+    whisker_move = breath * 2 / 3
+
+    shapes = [
+        # Тело
+        ('body', 'oval', (70, 100 + breath, 130, 160 + breath),
+         {'fill': colors['main'], 'outline': colors['main']}),
+        # Живот
+        ('belly', 'oval', (85, 130 + breath, 115, 160 + breath),
+         {'fill': colors['belly'], 'outline': colors['belly']}),
+        # Голова
+        ('head', 'oval', (60, 60, 140, 120),
+         {'fill': colors['main'], 'outline': colors['main']}),
+        # Уши
+        ('ear_left', 'polygon', (70 - ear_twitch, 60, 85, 80, 65 - ear_twitch, 80),
+         {'fill': colors['main']}),
+        ('ear_right', 'polygon', (130 + ear_twitch, 60, 140 + ear_twitch, 80, 115, 80),
+         {'fill': colors['main']}),
+    ]
+
+    if pose.eye_height > 0:
+        eye_h = pose.eye_height
+        pupil_y = 85 + pose.pupil_dy
+        shapes += [
+            # Глаза
+            ('eye_left', 'oval', (75, 85 - eye_h / 2, 95, 85 + eye_h / 2),
+             {'fill': colors['eye']}),
+            ('eye_right', 'oval', (105, 85 - eye_h / 2, 125, 85 + eye_h / 2),
+             {'fill': colors['eye']}),
+            # Зрачки
+            ('pupil_left', 'oval', (82, pupil_y - 2, 88, pupil_y + 2), {'fill': "black"}),
+            ('pupil_right', 'oval', (112, pupil_y - 2, 118, pupil_y + 2), {'fill': "black"}),
+        ]
+    else:
+        # Закрытые глаза
+        shapes += [
+            ('lid_left', 'line', (75, 85, 95, 85), {'fill': "black", 'width': 2}),
+            ('lid_right', 'line', (105, 85, 125, 85), {'fill': "black", 'width': 2}),
+        ]
+
+    # Нос
+    shapes.append(('nose', 'polygon', (97, 90, 103, 90, 100, 95), {'fill': colors['nose']}))
+
+    # Усы
+    for i in range(3):
+        shapes.append((f'whisker_left_{i}', 'line',
+                       (70, 90 + i*5, 40 + whisker_move, 85 + i*5),
+                       {'fill': colors['whisker']}))
+        shapes.append((f'whisker_right_{i}', 'line',
+                       (130, 90 + i*5, 160 - whisker_move, 85 + i*5),
+                       {'fill': colors['whisker']}))
+
+    # Хвост
+    shapes.append(('tail', 'line', (130, 140 + breath, 150 + pose.tail, 120 + breath),
+                   {'fill': colors['main'], 'width': 10}))
+    return shapes
+
+
+def mirror_shapes(shapes: list, width: int = CANVAS_SIZE) -> list:
+    """Отражение фигур по горизонтали относительно центра холста"""
+    mirrored = []
+    for name, kind, coords, options in shapes:
+        coords = tuple(width - c if i % 2 == 0 else c for i, c in enumerate(coords))
+        mirrored.append((name, kind, coords, options))
+    return mirrored
+
+
+def pose_shapes(pose: Pose, colors: dict = CAT_COLORS) -> list:
+    """Фигуры кота с учётом направления взгляда"""
+    shapes = cat_shapes(pose, colors)
+    if pose.direction != 1:
+        shapes = mirror_shapes(shapes)
+    return shapes
+
+
+def rasterize(shapes: list, box: Tuple[int, int, int, int] = SPRITE_BOX):
+    """Отрисовка фигур в изображение PIL, обрезанное по области box"""
+    left, top, right, bottom = box
+    # PIL нужен только спрайтам, поэтому загружается при первом кадре
+    from PIL import Image, ImageDraw
+
+    image = Image.new('RGB', (right - left, bottom - top), 'white')
+    draw = ImageDraw.Draw(image)
+
+    for _, kind, coords, options in shapes:
+        points = [c - (left if i % 2 == 0 else top) for i, c in enumerate(coords)]
+        if kind == 'oval':
+            x0, y0, x1, y1 = points
+            draw.ellipse([min(x0, x1), min(y0, y1), max(x0, x1), max(y0, y1)],
+                         fill=options.get('fill'),
+                         outline=options.get('outline', "black"))
+        elif kind == 'polygon':
+            draw.polygon(points, fill=options.get('fill'), outline=options.get('outline'))
+        elif kind == 'line':
+            draw.line(points, fill=options.get('fill', "black"),
+                      width=options.get('width', 1))
+    return image
+
+
+class SpriteCache:
+    """LRU-кэш отрисованных или декодированных кадров кота
+
+    source получает ключ кадра и возвращает изображение PIL; по умолчанию
+    кадр рисуется из фигур позы.
+    """
+    def __init__(self, max_frames: int = SPRITE_CACHE_FRAMES, photo_factory=None, source=None):
+        self.max_frames = max_frames
+        self.source = source or (lambda pose: rasterize(pose_shapes(pose)))
+        if photo_factory is None:
+            from PIL import ImageTk
+            photo_factory = ImageTk.PhotoImage
+        self.photo_factory = photo_factory
+        self.frames = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        """Кадр для ключа: из кэша или только что полученный из source"""
+        frame = self.frames.get(key)
+        if frame is not None:
+            self.frames.move_to_end(key)
+            self.hits += 1
+            return frame
+
+        self.misses += 1
+        frame = self.photo_factory(self.source(key))
+        self.frames[key] = frame
+        # Вытесняем давно не использованные кадры
+        while len(self.frames) > self.max_frames:
+            self.frames.popitem(last=False)
+        return frame
+
+    def clear(self) -> None:
+        """Очистка кэша"""
+        self.frames.clear()
+
+
+class SpriteRenderer:
+    """Отрисовка кота одним кэшированным изображением на кадр"""
+    # Позы для кэша строятся из фаз с этим числом положений за цикл
+    phase_steps = PHASE_STEPS
+
+    def __init__(self, canvas, cache: Optional[SpriteCache] = None):
+        self.canvas = canvas
+        self.cache = cache or SpriteCache()
+        # Левый верхний угол кадра на холсте
+        self.origin = SPRITE_BOX[:2]
+        self.item = None
+        self.frame = None
+
+    def key(self, pose: Pose) -> Pose:
+        """Видимая часть позы: кадры различаются только по ней"""
+        return quantize_pose(pose)
+
+    def draw(self, pose: Pose) -> None:
+        """Показ кадра для позы, полученной из key()"""
+        frame = self.cache.get(pose)
+        if self.item is None:
+            self.item = self.canvas.create_image(*self.origin, anchor='nw', image=frame)
+        elif frame is not self.frame:
+            self.canvas.itemconfig(self.item, image=frame)
+        self.frame = frame
+
+
+class RetainedRenderer:
+    """Отрисовка кота постоянными элементами холста
+
+    Элементы создаются один раз, а в каждом кадре меняются только
+    координаты тех из них, чья геометрия действительно изменилась.
+    """
+    phase_steps = None
+
+    def __init__(self, canvas):
+        self.canvas = canvas
+        self.items = {}      # имя фигуры -> элемент холста
+        self.coords = {}     # имя фигуры -> последние координаты
+        self.visible = set()
+
+    def key(self, pose: Pose) -> Pose:
+        """Видимая часть позы: холст рисует в целых пикселях"""
+        return round_pose(pose)
+
+    def draw(self, pose: Pose) -> None:
+        """Обновление элементов холста под позу, полученную из key()"""
+        shown = set()
+        previous = None
+        for name, kind, coords, options in pose_shapes(pose):
+            # Холст рисует в целых пикселях, дробные изменения не видны
+            coords = tuple(round(c) for c in coords)
+            shown.add(name)
+            item = self.items.get(name)
+            if item is None:
+                item = self._create(kind, coords, options)
+                if previous is not None:
+                    # Сохраняем порядок наложения фигур
+                    self.canvas.tag_raise(item, previous)
+                self.items[name] = item
+                self.coords[name] = coords
+            else:
+                if coords != self.coords[name]:
+                    self.canvas.coords(item, *coords)
+                    self.coords[name] = coords
+                if name not in self.visible:
+                    self.canvas.itemconfig(item, state='normal')
+            previous = item
+
+        for name in self.visible - shown:
+            self.canvas.itemconfig(self.items[name], state='hidden')
+        self.visible = shown
+
+    def _create(self, kind: str, coords: tuple, options: dict):
+        """Создание элемента холста для фигуры"""
+        if kind == 'oval':
+            return self.canvas.create_oval(*coords, **options)
+        if kind == 'polygon':
+            return self.canvas.create_polygon(*coords, **options)
+        return self.canvas.create_line(*coords, **options)
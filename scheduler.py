@@ -0,0 +1,72 @@
+import math
+import time
+from typing import Callable
+
+from simulation import BASE_DT
+
+# Допустимая наибольшая частота кадров
+MIN_FPS = 1.0
+MAX_FPS = 240.0
+
+
+def clamp_fps(max_fps) -> float:
+    """Частота кадров, сведённая к допустимой; ValueError, если это не конечное число"""
+    max_fps = float(max_fps)
+    if not math.isfinite(max_fps):
+        raise ValueError(f"частота кадров должна быть конечным числом: {max_fps}")
+    return min(MAX_FPS, max(MIN_FPS, max_fps))
+
+
+class FrameScheduler:
+    """Планировщик кадров с переменным шагом и снижением частоты в покое
+
+    Измеряет реальное время между кадрами, чтобы физика и анимация
+    получали настоящий dt, и подбирает задержку до следующего кадра
+    по режиму: спящий или неподвижный кот обновляется редко,
+    движущийся - с частотой до max_fps. Без adaptive частота
+    всегда равна max_fps.
+    """
+    # Частота кадров в режимах покоя
+    IDLE_FPS = {'sleeping': 4, 'idle': 10, 'paused': 4}
+    # Наибольший учитываемый шаг, например после спящего режима системы
+    MAX_DT = 0.25
+    # Во сколько раз кадр должен превысить интервал, чтобы считаться опоздавшим
+    LATE_FACTOR = 1.5
+
+    def __init__(self, max_fps: float = 30, clock: Callable[[], float] = time.perf_counter,
+                 adaptive: bool = True):
+        self.max_fps = max_fps
+        self.adaptive = adaptive
+        self.clock = clock
+        self.mode = 'active'
+        self.dt = BASE_DT
+        self.last_frame = None
+        self.interval = None
+        self.late = False
+
+    def begin_frame(self) -> float:
+        """Начало кадра: возвращает время, прошедшее с прошлого кадра"""
+        now = self.clock()
+        if self.last_frame is not None:
+            elapsed = now - self.last_frame
+            self.late = self.interval is not None and elapsed > self.interval * self.LATE_FACTOR
+            self.dt = min(elapsed, self.MAX_DT)
+        self.last_frame = now
+        return self.dt
+
+    def frame_interval(self, mode: str) -> float:
+        """Желаемый интервал между кадрами для режима"""
+        if not self.adaptive:
+            return 1.0 / self.max_fps
+        fps = min(self.IDLE_FPS.get(mode, self.max_fps), self.max_fps)
+        return 1.0 / fps
+
+    def next_delay(self, mode: str) -> int:
+        """Задержка до следующего кадра в миллисекундах
+
+        Из интервала вычитается время, уже потраченное на текущий кадр.
+        """
+        self.mode = mode
+        self.interval = self.frame_interval(mode)
+        spent = self.clock() - self.last_frame if self.last_frame is not None else 0.0
+        return max(1, int((self.interval - spent) * 1000))
@@ -0,0 +1,162 @@
+import threading
+import time
+from typing import Callable, NamedTuple, Optional, Tuple
+
+from commands import CommandBus
+from display import PointerSample
+from render import AnimationState
+from simulation import BASE_DT
+
+# Сколько шагов симуляции можно догонять подряд после задержки,
+# дальше отставание просто забывается
+MAX_CATCH_UP = 5
+
+
+class Snapshot(NamedTuple):
+    """Неизменяемое состояние кота после шага симуляции"""
+    time: float
+    x: float
+    y: float
+    behavior: str
+    mode: str                   # режим частоты кадров, см. DesktopPet.frame_mode
+    animation: AnimationState   # копия, поток симуляции её больше не меняет
+
+
+def interpolate(previous: Optional[Snapshot], latest: Snapshot, now: float) -> Snapshot:
+    """Состояние между двумя снимками для момента now
+
+    Кадр отстаёт от симуляции на один шаг, зато положение и плавные фазы
+    анимации меняются без рывков при любой частоте кадров.
+    """
+    if previous is None or latest.time <= previous.time:
+        return latest
+    alpha = min(1.0, max(0.0, (now - latest.time) / (latest.time - previous.time)))
+    if alpha >= 1.0:
+        return latest
+    old, new = previous.animation, latest.animation
+    animation = AnimationState(
+        tail_angle=old.tail_angle + (new.tail_angle - old.tail_angle) * alpha,
+        ear_angle=new.ear_angle,
+        eye_size=new.eye_size,
+        breath_phase=old.breath_phase + (new.breath_phase - old.breath_phase) * alpha,
+        direction=new.direction,
+    )
+    return latest._replace(
+        x=previous.x + (latest.x - previous.x) * alpha,
+        y=previous.y + (latest.y - previous.y) * alpha,
+        animation=animation,
+    )
+
+
+class SnapshotBuffer:
+    """Двойной буфер снимков: предыдущий и последний
+
+    Пара заменяется одним присваиванием, поэтому читатель в другом потоке
+    всегда получает согласованные снимки без блокировок.
+    """
+    def __init__(self):
+        self.pair = (None, None)
+
+    def publish(self, snapshot: Snapshot) -> None:
+        """Новый последний снимок; прежний становится предыдущим"""
+        self.pair = (self.pair[1], snapshot)
+
+    def read(self) -> Tuple[Optional[Snapshot], Optional[Snapshot]]:
+        """Предыдущий и последний снимки"""
+        return self.pair
+
+
+class SimulationThread:
+    """Симуляция кота в отдельном потоке с постоянным шагом
+
+    Поток выполняет ИИ, физику и фазы анимации кота через
+    DesktopPet.simulate() и после каждого шага публикует снимок. Поток Tk
+    только отправляет ввод через очередь и рисует последний снимок, поэтому
+    всплески работы ИИ или сохранения не задерживают кадры.
+    """
+    def __init__(self, pet, tick: float = BASE_DT, clock: Callable[[], float] = time.perf_counter):
+        self.pet = pet
+        self.tick = tick
+        self.clock = clock
+        self.inputs = CommandBus()
+        self.snapshots = SnapshotBuffer()
+        self.pointer = None
+        self.bounds = pet.geometry.bounds()
+        self.ticks = 0
+        self.overruns = 0
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self._run, name="cat-simulation", daemon=True)
+
+    def start(self) -> None:
+        """Запуск потока симуляции"""
+        self.snapshots.publish(self.snapshot())
+        self.thread.start()
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """Остановка потока симуляции"""
+        self.stopped.set()
+        if self.thread.is_alive():
+            self.thread.join(timeout)
+
+    def is_current(self) -> bool:
+        """Вызван ли код из потока симуляции"""
+        return threading.current_thread() is self.thread
+
+    def screen_bounds(self) -> Tuple[int, int]:
+        """Размеры экрана, присланные потоком Tk"""
+        return self.bounds
+
+    def post(self, name: str, *args) -> None:
+        """Отправка действия в поток симуляции"""
+        self.inputs.post(name, *args)
+
+    def post_pointer(self, pointer: Optional[PointerSample], bounds: Tuple[int, int]) -> None:
+        """Отправка замера курсора и размеров экрана из потока Tk"""
+        self.inputs.post('pointer', pointer, bounds)
+
+    def snapshot(self) -> Snapshot:
+        """Снимок текущего состояния кота"""
+        pet = self.pet
+        return Snapshot(self.clock(), pet.physics.x, pet.physics.y, pet.cat_ai.current_behavior,
+                        pet.frame_mode(), AnimationState(**pet.animation_state.snapshot()))
+
+    def _apply_inputs(self) -> None:
+        """Применение накопившегося ввода"""
+        for name, args in self.inputs.drain():
+            if name == 'pointer':
+                pointer, self.bounds = args
+                # Движение над котом не теряется, если замеры пришли быстрее шага
+                if (pointer is not None and self.pointer is not None and
+                        self.pointer.over_pet and not pointer.over_pet):
+                    pointer = pointer._replace(over_pet=True)
+                self.pointer = pointer
+                continue
+            handler = self.pet.command_handlers.get(name)
+            if handler is not None:
+                handler(*args)
+
+    def _run(self) -> None:
+        """Цикл потока симуляции"""
+        next_tick = self.clock()
+        while not self.stopped.is_set():
+            try:
+                self._apply_inputs()
+                if not self.pet.paused:
+                    self.pet.simulate(self.tick, self.pointer)
+                    if self.pointer is not None and self.pointer.over_pet:
+                        self.pointer = self.pointer._replace(over_pet=False)
+                    self.snapshots.publish(self.snapshot())
+                    self.ticks += 1
+            except Exception as e:
+                self.pet.stats.record_error()
+                print(f"Ошибка в симуляции: {e}")
+
+            # Шаги идут по расписанию; после задержки догоняем, но не бесконечно
+            next_tick += self.tick
+            delay = next_tick - self.clock()
+            if delay < -self.tick * MAX_CATCH_UP:
+                self.overruns += 1
+                next_tick = self.clock()
+                delay = 0.0
+            if delay > 0:
+                self.stopped.wait(delay)
@@ -0,0 +1,489 @@
+import argparse
+import heapq
+import json
+import math
+import random
+import time
+from typing import Callable, Optional, Tuple
+
+from behaviors import BehaviorEngine, load_engine
+from persistence import PersistenceWorker, write_json_atomic
+
+# Базовый шаг кадра, под который подобраны константы физики
+BASE_DT = 0.05
+# Трение за один базовый кадр
+FRICTION = 0.95
+# Установившаяся скорость на единицу ускорения
+TERMINAL_FACTOR = BASE_DT * FRICTION / (1 - FRICTION)
+# Размер окна кота
+PET_SIZE = 200
+# Размер экрана, если настоящий неизвестен
+DEFAULT_SCREEN = (1920, 1080)
+
+# Файлы состояния и личности кота
+STATE_FILE = 'cat_state.json'
+PERSONALITY_FILE = 'cat_personality.json'
+# Как часто сохранять состояние во время работы, секунды
+SAVE_INTERVAL = 5.0
+
+class SlotState:
+    """Основа компактных состояний: поля в __slots__, снимок в виде словаря
+
+    У объектов нет __dict__, поэтому они занимают меньше памяти, а чтение
+    полей в каждом кадре обходится без поиска по словарю.
+    """
+    __slots__ = ()
+
+    def snapshot(self) -> dict:
+        """Значения всех полей"""
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def restore(self, data: dict) -> None:
+        """Установка полей из снимка; незнакомые поля - ошибка"""
+        for name, value in data.items():
+            setattr(self, name, value)
+
+    def __eq__(self, other):
+        if type(other) is not type(self):
+            return NotImplemented
+        return self.snapshot() == other.snapshot()
+
+    def __repr__(self):
+        fields = ', '.join(f'{name}={value!r}' for name, value in self.snapshot().items())
+        return f'{type(self).__name__}({fields})'
+
+
+class CatState(SlotState):
+    """Класс для хранения состояния кота"""
+    __slots__ = ('energy', 'happiness', 'hunger', 'last_update',
+                 'target_x', 'target_y', 'state_change_time')
+
+    def __init__(self, energy: float = 100.0, happiness: float = 100.0, hunger: float = 0.0,
+                 last_update: Optional[float] = None, target_x: Optional[float] = None,
+                 target_y: Optional[float] = None, state_change_time: Optional[float] = None):
+        # Время по умолчанию - момент создания, а не загрузки модуля
+        now = time.time()
+        self.energy = energy
+        self.happiness = happiness
+        self.hunger = hunger
+        self.last_update = now if last_update is None else last_update
+        self.target_x = target_x
+        self.target_y = target_y
+        self.state_change_time = now if state_change_time is None else state_change_time
+
+
+class Kinematics(SlotState):
+    """Положение, скорость и ускорение кота на экране"""
+    __slots__ = ('x', 'y', 'vx', 'vy', 'ax', 'ay')
+
+    def __init__(self, x: float = 0.0, y: float = 0.0, vx: float = 0.0, vy: float = 0.0,
+                 ax: float = 0.0, ay: float = 0.0):
+        self.x = x
+        self.y = y
+        self.vx = vx
+        self.vy = vy
+        self.ax = ax
+        self.ay = ay
+
+class CatPersonality:
+    """Класс для определения личности кота"""
+    # Фоновая запись файлов; без неё файл пишется сразу
+    persistence = None
+
+    def __init__(self, save: bool = True, rng=random):
+        self.playfulness = rng.uniform(0.3, 1.0)
+        self.laziness = rng.uniform(0.3, 1.0)
+        self.curiosity = rng.uniform(0.3, 1.0)
+        self.friendliness = rng.uniform(0.3, 1.0)
+        
+        # Сохраняем личность кота
+        if save:
+            self.save_personality()
+    
+    def save_personality(self):
+        """Сохранение личности кота в файл"""
+        data = {
+            "playfulness": self.playfulness,
+            "laziness": self.laziness,
+            "curiosity": self.curiosity,
+            "friendliness": self.friendliness
+        }
+        if self.persistence is not None:
+            self.persistence.submit(PERSONALITY_FILE, data)
+            return
+        try:
+            write_json_atomic(PERSONALITY_FILE, data)
+        except Exception as e:
+            print(f"Не удалось сохранить личность кота: {e}")
+
+    @classmethod
+    def load_personality(cls, persistence: Optional[PersistenceWorker] = None):
+        """Загрузка личности кота из файла; новая личность сохраняется через persistence"""
+        try:
+            with open(PERSONALITY_FILE, 'r') as f:
+                data = json.load(f)
+                # Загруженная личность уже сохранена, перезаписывать файл незачем
+                personality = cls(save=False)
+                personality.playfulness = data["playfulness"]
+                personality.laziness = data["laziness"]
+                personality.curiosity = data["curiosity"]
+                personality.friendliness = data["friendliness"]
+                personality.persistence = persistence
+                return personality
+        except:
+            # Новая личность пишется фоновым потоком, как и остальные файлы
+            personality = cls(save=False)
+            personality.persistence = persistence
+            personality.save_personality()
+            return personality
+
+class CatAI:
+    """Искусственный интеллект кота"""
+    # Скорость изменения потребностей в секунду
+    ENERGY_DECAY = 0.1
+    HUNGER_GROWTH = 0.15
+    HAPPINESS_DECAY = 0.05
+    # Куда потребности движутся сами по себе: -1 убывает, 1 растёт
+    NEED_TRENDS = {'energy': -1, 'happiness': -1, 'hunger': 1}
+
+    def __init__(self, clock: Callable[[], float] = time.time, persistent: bool = True,
+                 persistence: Optional[PersistenceWorker] = None,
+                 screen_bounds: Callable[[], Tuple[int, int]] = lambda: DEFAULT_SCREEN,
+                 rng=random, engine: Optional[BehaviorEngine] = None):
+        self.clock = clock
+        self.engine = engine or load_engine()
+        # Генератор случайных чисел; по умолчанию общий модуль random
+        self.rng = rng
+        self.screen_bounds = screen_bounds
+        self.persistent = persistent
+        self.persistence = persistence
+        # История потребностей, если её ведут (см. history.NeedHistory)
+        self.history = None
+        now = clock()
+        self.state = CatState(last_update=now, state_change_time=now)
+        self.last_save = now
+        if persistent:
+            self.personality = CatPersonality.load_personality(persistence)
+        else:
+            self.personality = CatPersonality(save=False, rng=rng)
+        
+        # Очередь отложенных событий: (время, номер, событие)
+        self.timers = []
+        self.timer_seq = 0
+        self.behavior_timer = None
+        
+        # Накопленные веса поведений по полосам потребностей
+        self.weight_tables = {}
+        
+        self._start_behavior(self.engine.names[self.engine.default], now)
+        
+        # Загружаем предыдущее состояние, если есть
+        if persistent:
+            self.load_state()
+
+    def save_state(self):
+        """Сохранение состояния кота"""
+        data = {
+            "energy": self.state.energy,
+            "happiness": self.state.happiness,
+            "hunger": self.state.hunger,
+            "last_update": self.state.last_update
+        }
+        if self.persistence is not None:
+            self.persistence.submit(STATE_FILE, data)
+            return
+        try:
+            write_json_atomic(STATE_FILE, data)
+        except Exception as e:
+            print(f"Не удалось сохранить состояние кота: {e}")
+
+    def load_state(self):
+        """Загрузка состояния кота"""
+        try:
+            with open(STATE_FILE, 'r') as f:
+                data = json.load(f)
+                self.state.energy = data["energy"]
+                self.state.happiness = data["happiness"]
+                self.state.hunger = data["hunger"]
+                self.state.last_update = data["last_update"]
+        except:
+            return  # Используем значения по умолчанию
+        
+        # Наверстываем время, пока программа была закрыта
+        self.catch_up()
+
+    def catch_up(self, now: Optional[float] = None) -> int:
+        """Продвижение кота через время, пока программа была закрыта
+
+        Потребности меняются линейно, поэтому между сменами поведения
+        они считаются в замкнутой форме, а моделируются только сами
+        смены поведения. Возвращает количество смоделированных смен.
+        """
+        if now is None:
+            now = self.clock()
+        current_time = self.state.last_update
+        transitions = 0
+        
+        # Текущее поведение началось в момент последнего обновления
+        self._start_behavior(self.current_behavior, current_time)
+        while True:
+            # Навязанное потребностями поведение, которое само не отпустит,
+            # например сон уставшего кота, длится до конца простоя
+            if self.engine.settled(self.state, self.behavior_index, self.NEED_TRENDS):
+                break
+            change_time = self.behavior_deadline
+            if change_time >= now:
+                break
+            self._advance_needs(change_time - current_time)
+            current_time = change_time
+            self._choose_new_behavior(None, now=current_time)
+            transitions += 1
+        
+        self._advance_needs(max(0.0, now - current_time))
+        if self.behavior_deadline <= now:
+            self._start_behavior(self.current_behavior, now)
+        self.state.last_update = now
+        return transitions
+
+    def shift_time(self, offset: float) -> None:
+        """Сдвиг всех отметок времени, например чтобы пауза не считалась прожитой"""
+        self.state.last_update += offset
+        self.state.state_change_time += offset
+        self.behavior_deadline += offset
+        # Сдвиг всех сроков на одну величину не нарушает порядок кучи
+        self.timers = [(at + offset, seq, event) for at, seq, event in self.timers]
+
+    def schedule(self, at: float, event: str) -> int:
+        """Постановка события в очередь на момент at, возвращает номер таймера"""
+        self.timer_seq += 1
+        heapq.heappush(self.timers, (at, self.timer_seq, event))
+        return self.timer_seq
+
+    def _start_behavior(self, behavior: str, now: float) -> None:
+        """Начало поведения с одним сроком окончания на всё поведение"""
+        self.current_behavior = behavior
+        self.behavior_index = self.engine.index[behavior]
+        self.state.state_change_time = now
+        self.behavior_deadline = now + self._get_behavior_duration()
+        self.behavior_timer = self.schedule(self.behavior_deadline, 'behavior_end')
+
+    def _advance_needs(self, dt: float) -> None:
+        """Изменение потребностей за dt секунд"""
+        self.state.energy = max(0.0, min(100.0, self.state.energy - dt * self.ENERGY_DECAY * self.personality.laziness))
+        self.state.hunger = min(100.0, self.state.hunger + dt * self.HUNGER_GROWTH)
+        self.state.happiness = max(0.0, min(100.0, self.state.happiness - dt * self.HAPPINESS_DECAY))
+
+    def update(self, cursor_pos: Optional[Tuple[int, int]] = None) -> None:
+        """Обновление состояния кота"""
+        current_time = self.clock()
+        dt = current_time - self.state.last_update
+        
+        # Обновляем характеристики с учетом времени
+        self._advance_needs(dt)
+        
+        # Обрабатываем наступившие события
+        while self.timers and self.timers[0][0] <= current_time:
+            at, seq, event = heapq.heappop(self.timers)
+            # Таймеры прерванных поведений устарели
+            if event == 'behavior_end' and seq == self.behavior_timer:
+                self._choose_new_behavior(cursor_pos, now=at)
+        
+        self.state.last_update = current_time
+        if self.history is not None:
+            self.history.record(current_time, self.state, self.behavior_index)
+        
+        # Периодически сохраняем состояние
+        if self.persistent and current_time - self.last_save >= SAVE_INTERVAL:
+            self.last_save = current_time
+            self.save_state()
+
+    def _get_behavior_duration(self) -> float:
+        """Получение длительности текущего поведения"""
+        return self.engine.duration(self.behavior_index, self.rng)
+
+    def _choose_new_behavior(self, cursor_pos: Optional[Tuple[int, int]],
+                             now: Optional[float] = None) -> None:
+        """Выбор нового поведения кота"""
+        engine = self.engine
+        # Принудительные состояния на основе потребностей
+        behavior = engine.forced(self.state)
+        # Интерес к курсору
+        curious = (behavior is None and cursor_pos and engine.cursor_behavior is not None and
+                   self.rng.random() < getattr(self.personality, engine.cursor_trait) and
+                   self.behavior_index not in engine.cursor_except)
+        if curious:
+            behavior = engine.cursor_behavior
+            self.state.target_x, self.state.target_y = self.clamp_target(*cursor_pos)
+        elif behavior is None:
+            # Веса пересчитываются, только когда потребности переходят в другую полосу
+            band = engine.band(self.state)
+            table = self.weight_tables.get(band)
+            if table is None:
+                table = self.weight_tables[band] = engine.cum_weights(band, self.personality)
+            
+            # Выбираем новое поведение
+            behavior = engine.choose(*table, self.rng)
+            
+            # Определяем новую цель для движения
+            if engine.wander[behavior]:
+                self._random_target()
+        
+        self._start_behavior(engine.names[behavior], self.clock() if now is None else now)
+
+    def set_behavior(self, behavior: str) -> None:
+        """Смена поведения по команде извне, с обычной случайной длительностью"""
+        index = self.engine.index.get(behavior)
+        if index is None:
+            raise ValueError(f"Неизвестное поведение '{behavior}'")
+        if self.engine.wander[index]:
+            self._random_target()
+        self._start_behavior(behavior, self.clock())
+
+    def _random_target(self) -> None:
+        """Случайная цель движения в пределах экрана"""
+        screen_width, screen_height = self.screen_bounds()
+        self.state.target_x = self.rng.randint(0, max(0, screen_width - PET_SIZE))
+        self.state.target_y = self.rng.randint(0, max(0, screen_height - PET_SIZE))
+
+    def clamp_target(self, x: float, y: float) -> Tuple[float, float]:
+        """Цель движения, ограниченная местом, куда окно кота может встать"""
+        screen_width, screen_height = self.screen_bounds()
+        return (max(0, min(x, screen_width - PET_SIZE)),
+                max(0, min(y, screen_height - PET_SIZE)))
+
+
+def step_physics(physics: Kinematics, cat_ai: CatAI, dt: float,
+                 screen_bounds: Tuple[int, int]) -> Optional[int]:
+    """Шаг физики движения кота
+
+    Возвращает новое направление взгляда (1 или -1) или None, если оно
+    не изменилось. Движение считает integrate(), поэтому оно не зависит
+    от частоты кадров.
+    """
+    direction = None
+    state = cat_ai.state
+    
+    if state.target_x is not None and state.target_y is not None:
+        # Вычисляем вектор к цели
+        dx = state.target_x - physics.x
+        dy = state.target_y - physics.y
+        distance = math.sqrt(dx*dx + dy*dy)
+        
+        if distance > 5:  # Если достаточно далеко от цели
+            # Нормализуем направление
+            dx /= distance
+            dy /= distance
+            
+            # Задаем ускорение
+            speed = cat_ai.engine.speed[cat_ai.behavior_index]
+            physics.ax = dx * speed
+            physics.ay = dy * speed
+            
+            # Обновляем направление кота
+            direction = 1 if dx > 0 else -1
+        else:
+            physics.ax = physics.ay = 0.0
+            state.target_x = None
+            state.target_y = None
+    
+    integrate(physics, dt)
+    
+    # Проверяем границы экрана
+    screen_width, screen_height = screen_bounds
+    physics.x = max(0, min(physics.x, screen_width - PET_SIZE))
+    physics.y = max(0, min(physics.y, screen_height - PET_SIZE))
+    
+    return direction
+
+
+def integrate(physics: Kinematics, dt: float) -> None:
+    """Движение с постоянным ускорением и трением за dt секунд
+
+    physics - любой объект с полями Kinematics. Трение и скорость заданы
+    на базовый кадр BASE_DT, для произвольного dt используется точное
+    решение той же покадровой схемы.
+    """
+    # Число базовых кадров в шаге и суммарное действие трения
+    frames = dt / BASE_DT
+    decay = FRICTION ** frames
+    friction_sum = FRICTION * (1 - decay) / (1 - FRICTION)
+    
+    # Скорость, к которой стремится объект при постоянном ускорении
+    terminal_x = physics.ax * TERMINAL_FACTOR
+    terminal_y = physics.ay * TERMINAL_FACTOR
+    
+    # Обновляем позицию и скорость
+    physics.x += friction_sum * physics.vx + terminal_x * (frames - friction_sum)
+    physics.y += friction_sum * physics.vy + terminal_y * (frames - friction_sum)
+    physics.vx = decay * physics.vx + terminal_x * (1 - decay)
+    physics.vy = decay * physics.vy + terminal_y * (1 - decay)
+
+
+class ManualClock:
+    """Часы симуляции, которые двигаются только вручную"""
+    def __init__(self, start: float = 0.0):
+        self.now = start
+
+    def __call__(self) -> float:
+        return self.now
+
+    def advance(self, dt: float) -> None:
+        """Сдвиг часов на dt секунд"""
+        self.now += dt
+
+
+class HeadlessSimulation:
+    """Симуляция кота без дисплея: ИИ и физика с шагом step(dt)"""
+    def __init__(self, screen_bounds: Callable[[], Tuple[int, int]] = lambda: DEFAULT_SCREEN,
+                 clock: Optional[ManualClock] = None, persistent: bool = False):
+        self.clock = clock or ManualClock()
+        self.screen_bounds = screen_bounds
+        self.cat_ai = CatAI(clock=self.clock, persistent=persistent, screen_bounds=screen_bounds)
+
+        screen_width, screen_height = screen_bounds()
+        self.physics = Kinematics(float(random.randint(0, screen_width - PET_SIZE)),
+                                  float(random.randint(0, screen_height - PET_SIZE)))
+        self.direction = 1
+        self.steps = 0
+        self.behavior_time = {behavior: 0.0 for behavior in self.cat_ai.engine.names}
+
+    def step(self, dt: float = BASE_DT) -> None:
+        """Продвижение симуляции на dt секунд"""
+        self.clock.advance(dt)
+        self.cat_ai.update()
+        direction = step_physics(self.physics, self.cat_ai, dt, self.screen_bounds())
+        if direction is not None:
+            self.direction = direction
+        self.behavior_time[self.cat_ai.current_behavior] += dt
+        self.steps += 1
+
+    def run(self, duration: float, dt: float = BASE_DT) -> None:
+        """Симуляция duration секунд с постоянным шагом dt"""
+        for _ in range(int(duration / dt)):
+            self.step(dt)
+
+
+def main():
+    """Прогон симуляции без дисплея с выводом итоговой статистики"""
+    parser = argparse.ArgumentParser(description="Симуляция кота без дисплея")
+    parser.add_argument('--days', type=float, default=7.0, help="длительность в сутках")
+    parser.add_argument('--dt', type=float, default=1.0, help="шаг симуляции в секундах")
+    parser.add_argument('--seed', type=int, default=None, help="зерно генератора случайных чисел")
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    simulation = HeadlessSimulation()
+    started = time.perf_counter()
+    simulation.run(args.days * 86400, args.dt)
+    elapsed = time.perf_counter() - started
+
+    state = simulation.cat_ai.state
+    print(f"Смоделировано {args.days:g} сут. за {elapsed:.2f} с ({simulation.steps} шагов)")
+    print(f"Энергия: {state.energy:.1f}, голод: {state.hunger:.1f}, радость: {state.happiness:.1f}")
+    total = sum(simulation.behavior_time.values()) or 1.0
+    for behavior, seconds in simulation.behavior_time.items():
+        print(f"  {behavior}: {seconds / total:.1%}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,389 @@
+import argparse
+import math
+import random
+import time
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from simulation import BASE_DT, DEFAULT_SCREEN, PET_SIZE, SlotState, integrate
+
+# Размер ячейки сетки: запросы соседей в радиусе до размера ячейки
+# просматривают не больше 3x3 ячеек
+CELL_SIZE = PET_SIZE
+
+# Режимы рулевого управления
+ARRIVE = 'arrive'   # к цели с замедлением
+WANDER = 'wander'   # плавное блуждание
+STILL = 'still'     # не двигается сам, например игрушка
+
+# Прибытие: с какого расстояния замедляться и на каком останавливаться (как в step_physics)
+ARRIVE_RADIUS = 150.0
+ARRIVE_STOP = 5.0
+
+# Блуждание: круг перед объектом, точка на котором задаёт направление,
+# и разброс угла этой точки за секунду
+WANDER_DISTANCE = 60.0
+WANDER_RADIUS = 30.0
+WANDER_JITTER = 4.0
+
+# Обход: зазор между объектами, на котором начинается отталкивание, и его сила
+AVOID_MARGIN = 20.0
+AVOID_WEIGHT = 1.5
+
+
+class SpatialGrid:
+    """Равномерная сетка для поиска соседей
+
+    Объект лежит в одной ячейке по своей точке. move() перекладывает его,
+    только когда точка пересекла границу ячейки, поэтому обновление сетки
+    после шага стоит O(1) на объект. Запрос в радиусе просматривает ячейки
+    квадрата вокруг точки: при ограниченной плотности объектов его
+    стоимость не зависит от их общего числа.
+    """
+    def __init__(self, cell_size: float = CELL_SIZE):
+        self.cell_size = float(cell_size)
+        self.cells: Dict[Tuple[int, int], Set[int]] = {}
+        self.points: Dict[int, Tuple[float, float]] = {}
+        self.keys: Dict[int, Tuple[int, int]] = {}
+        # Переходы в другую ячейку и проверки расстояний, для статистики
+        self.moves = 0
+        self.checks = 0
+
+    def __len__(self) -> int:
+        return len(self.points)
+
+    def _key(self, x: float, y: float) -> Tuple[int, int]:
+        return (math.floor(x / self.cell_size), math.floor(y / self.cell_size))
+
+    def insert(self, item: int, x: float, y: float) -> None:
+        """Добавление объекта в точке x, y"""
+        key = self._key(x, y)
+        self.points[item] = (x, y)
+        self.keys[item] = key
+        self.cells.setdefault(key, set()).add(item)
+
+    def move(self, item: int, x: float, y: float) -> None:
+        """Новое положение объекта"""
+        self.points[item] = (x, y)
+        key = self._key(x, y)
+        old = self.keys[item]
+        if key != old:
+            self._discard(item, old)
+            self.keys[item] = key
+            self.cells.setdefault(key, set()).add(item)
+            self.moves += 1
+
+    def remove(self, item: int) -> None:
+        """Удаление объекта"""
+        self._discard(item, self.keys.pop(item))
+        del self.points[item]
+
+    def _discard(self, item: int, key: Tuple[int, int]) -> None:
+        cell = self.cells[key]
+        cell.discard(item)
+        # Пустые ячейки не копятся, сколько бы объекты ни бродили
+        if not cell:
+            del self.cells[key]
+
+    def query(self, x: float, y: float, radius: float, exclude: Optional[int] = None) -> List[int]:
+        """Объекты не дальше radius от точки x, y"""
+        size = self.cell_size
+        x0, y0 = math.floor((x - radius) / size), math.floor((y - radius) / size)
+        x1, y1 = math.floor((x + radius) / size), math.floor((y + radius) / size)
+        radius_sq = radius * radius
+        points = self.points
+        found = []
+        for cx in range(x0, x1 + 1):
+            for cy in range(y0, y1 + 1):
+                cell = self.cells.get((cx, cy))
+                if not cell:
+                    continue
+                self.checks += len(cell)
+                for item in cell:
+                    px, py = points[item]
+                    if (px - x) ** 2 + (py - y) ** 2 <= radius_sq and item != exclude:
+                        found.append(item)
+        return found
+
+    def pairs(self, radius: float) -> Iterator[Tuple[int, int]]:
+        """Все пары объектов не дальше radius друг от друга, каждая один раз"""
+        span = math.ceil(radius / self.cell_size)
+        # Соседние ячейки только «вперёд», чтобы пара не встретилась дважды
+        forward = [(dx, dy) for dx in range(0, span + 1) for dy in range(-span, span + 1)
+                   if dx > 0 or dy > 0]
+        radius_sq = radius * radius
+        points = self.points
+        for (cx, cy), cell in list(self.cells.items()):
+            items = list(cell)
+            for i, a in enumerate(items):
+                ax, ay = points[a]
+                self.checks += len(items) - i - 1
+                for b in items[i + 1:]:
+                    bx, by = points[b]
+                    if (ax - bx) ** 2 + (ay - by) ** 2 <= radius_sq:
+                        yield a, b
+            for dx, dy in forward:
+                other = self.cells.get((cx + dx, cy + dy))
+                if not other:
+                    continue
+                for a in items:
+                    ax, ay = points[a]
+                    self.checks += len(other)
+                    for b in other:
+                        bx, by = points[b]
+                        if (ax - bx) ** 2 + (ay - by) ** 2 <= radius_sq:
+                            yield a, b
+
+
+class Agent(SlotState):
+    """Кот или игрушка на общем экране
+
+    x, y - центр объекта, поля движения те же, что у Kinematics.
+    speed - ускорение при движении на полной скорости, как у поведений;
+    у игрушек оно нулевое, их двигают только столкновения. Коты обходят
+    друг друга, а игрушки не обходят, а толкают.
+    """
+    __slots__ = ('x', 'y', 'vx', 'vy', 'ax', 'ay', 'radius', 'speed', 'mode',
+                 'target_x', 'target_y', 'wander_angle')
+
+    def __init__(self, x: float, y: float, radius: float = PET_SIZE / 2, speed: float = 1.0,
+                 mode: str = WANDER, target_x: Optional[float] = None,
+                 target_y: Optional[float] = None, wander_angle: float = 0.0):
+        self.x = x
+        self.y = y
+        self.vx = self.vy = 0.0
+        self.ax = self.ay = 0.0
+        self.radius = radius
+        self.speed = speed
+        self.mode = mode
+        self.target_x = target_x
+        self.target_y = target_y
+        self.wander_angle = wander_angle
+
+
+def arrive(agent: Agent) -> Tuple[float, float]:
+    """Ускорение к цели, которое плавно спадает в радиусе ARRIVE_RADIUS
+
+    Ускорение задаёт установившуюся скорость, поэтому замедление
+    ускорения у цели - это замедление самого объекта.
+    """
+    if agent.target_x is None or agent.target_y is None:
+        return 0.0, 0.0
+    dx = agent.target_x - agent.x
+    dy = agent.target_y - agent.y
+    distance = math.sqrt(dx * dx + dy * dy)
+    if distance <= ARRIVE_STOP:
+        agent.target_x = agent.target_y = None
+        return 0.0, 0.0
+    scale = agent.speed * min(1.0, distance / ARRIVE_RADIUS) / distance
+    return dx * scale, dy * scale
+
+
+def wander(agent: Agent, dt: float, rng) -> Tuple[float, float]:
+    """Ускорение плавного блуждания
+
+    Направление - на точку круга перед объектом; точка понемногу
+    смещается по кругу, поэтому объект поворачивает без рывков.
+    """
+    agent.wander_angle += rng.uniform(-WANDER_JITTER, WANDER_JITTER) * dt
+    speed = math.sqrt(agent.vx * agent.vx + agent.vy * agent.vy)
+    if speed > 1e-6:
+        heading_x, heading_y = agent.vx / speed, agent.vy / speed
+    else:
+        heading_x, heading_y = math.cos(agent.wander_angle), math.sin(agent.wander_angle)
+    dx = heading_x * WANDER_DISTANCE + math.cos(agent.wander_angle) * WANDER_RADIUS
+    dy = heading_y * WANDER_DISTANCE + math.sin(agent.wander_angle) * WANDER_RADIUS
+    scale = agent.speed / math.sqrt(dx * dx + dy * dy)
+    return dx * scale, dy * scale
+
+
+def avoid(agent: Agent, neighbors: Iterable[Agent]) -> Tuple[float, float]:
+    """Ускорение от соседей, которые ближе зазора AVOID_MARGIN"""
+    push_x = push_y = 0.0
+    for other in neighbors:
+        dx = agent.x - other.x
+        dy = agent.y - other.y
+        reach = agent.radius + other.radius + AVOID_MARGIN
+        distance_sq = dx * dx + dy * dy
+        if distance_sq >= reach * reach:
+            continue
+        distance = math.sqrt(distance_sq)
+        if distance < 1e-6:
+            # Совпавшие центры расходятся в любую сторону
+            dx, dy, distance = 1.0, 0.0, 1.0
+        strength = (1 - distance / reach) / distance
+        push_x += dx * strength
+        push_y += dy * strength
+    weight = agent.speed * AVOID_WEIGHT
+    return push_x * weight, push_y * weight
+
+
+class SteeringWorld:
+    """Коты и игрушки на одном экране с рулевым управлением и столкновениями
+
+    Шаг: ускорения всех объектов по их режиму и соседям из сетки,
+    движение по той же схеме трения, что у одиночного кота, затем
+    расталкивание пересёкшихся объектов. Соседей и пары ищет
+    SpatialGrid, поэтому шаг растёт почти линейно с числом объектов.
+    """
+    def __init__(self, screen_bounds: Tuple[int, int] = DEFAULT_SCREEN,
+                 cell_size: float = CELL_SIZE, rng=random):
+        self.screen_bounds = screen_bounds
+        self.grid = SpatialGrid(cell_size)
+        self.rng = rng
+        self.agents: Dict[int, Agent] = {}
+        self.next_id = 0
+        self.max_radius = 0.0
+        self.collisions = 0
+
+    def add(self, agent: Agent) -> int:
+        """Добавление объекта, возвращает его номер"""
+        agent_id = self.next_id
+        self.next_id += 1
+        self.agents[agent_id] = agent
+        self.max_radius = max(self.max_radius, agent.radius)
+        self._clamp(agent)
+        self.grid.insert(agent_id, agent.x, agent.y)
+        return agent_id
+
+    def remove(self, agent_id: int) -> None:
+        """Удаление объекта"""
+        del self.agents[agent_id]
+        self.grid.remove(agent_id)
+
+    def neighbors(self, agent_id: int, radius: float) -> List[int]:
+        """Номера объектов, центры которых не дальше radius от центра объекта"""
+        agent = self.agents[agent_id]
+        return self.grid.query(agent.x, agent.y, radius, exclude=agent_id)
+
+    def step(self, dt: float = BASE_DT) -> int:
+        """Шаг всех объектов на dt секунд, возвращает число столкновений"""
+        agents = self.agents
+        grid = self.grid
+
+        # Ускорения считаются по положениям до шага, порядок объектов не важен
+        for agent_id, agent in agents.items():
+            if agent.mode == STILL:
+                agent.ax = agent.ay = 0.0
+                continue
+            if agent.mode == ARRIVE:
+                ax, ay = arrive(agent)
+            else:
+                ax, ay = wander(agent, dt, self.rng)
+            reach = agent.radius + self.max_radius + AVOID_MARGIN
+            nearby = grid.query(agent.x, agent.y, reach, exclude=agent_id)
+            push_x, push_y = avoid(agent, [agents[other] for other in nearby
+                                           if agents[other].mode != STILL])
+            agent.ax = ax + push_x
+            agent.ay = ay + push_y
+
+        for agent_id, agent in agents.items():
+            integrate(agent, dt)
+            self._clamp(agent)
+            grid.move(agent_id, agent.x, agent.y)
+
+        collisions = self._resolve_collisions()
+        self.collisions += collisions
+        return collisions
+
+    def _resolve_collisions(self) -> int:
+        """Расталкивание пересёкшихся объектов, лёгкие сдвигаются сильнее"""
+        agents = self.agents
+        moved = set()
+        collisions = 0
+        for a_id, b_id in self.grid.pairs(2 * self.max_radius):
+            a, b = agents[a_id], agents[b_id]
+            dx = a.x - b.x
+            dy = a.y - b.y
+            reach = a.radius + b.radius
+            distance_sq = dx * dx + dy * dy
+            if distance_sq >= reach * reach:
+                continue
+            collisions += 1
+            distance = math.sqrt(distance_sq)
+            if distance < 1e-6:
+                dx, dy, distance = 1.0, 0.0, 1.0
+            nx, ny = dx / distance, dy / distance
+            # Масса пропорциональна площади
+            mass_a, mass_b = a.radius * a.radius, b.radius * b.radius
+            share_a = mass_b / (mass_a + mass_b)
+            share_b = 1 - share_a
+            overlap = reach - distance
+            a.x += nx * overlap * share_a
+            a.y += ny * overlap * share_a
+            b.x -= nx * overlap * share_b
+            b.y -= ny * overlap * share_b
+            # Неупругий удар: сближение по нормали гасится, импульс сохраняется
+            closing = (a.vx - b.vx) * nx + (a.vy - b.vy) * ny
+            if closing < 0:
+                a.vx -= closing * share_a * nx
+                a.vy -= closing * share_a * ny
+                b.vx += closing * share_b * nx
+                b.vy += closing * share_b * ny
+            moved.add(a_id)
+            moved.add(b_id)
+
+        for agent_id in moved:
+            agent = agents[agent_id]
+            self._clamp(agent)
+            self.grid.move(agent_id, agent.x, agent.y)
+        return collisions
+
+    def _clamp(self, agent: Agent) -> None:
+        """Удержание объекта на экране; скорость в край гасится"""
+        screen_width, screen_height = self.screen_bounds
+        radius = agent.radius
+        if agent.x < radius or agent.x > screen_width - radius:
+            agent.x = max(radius, min(agent.x, screen_width - radius))
+            agent.vx = 0.0
+        if agent.y < radius or agent.y > screen_height - radius:
+            agent.y = max(radius, min(agent.y, screen_height - radius))
+            agent.vy = 0.0
+
+
+def populate(world: SteeringWorld, cats: int, toys: int, rng=random) -> None:
+    """Случайные блуждающие коты и неподвижные игрушки"""
+    screen_width, screen_height = world.screen_bounds
+    for _ in range(cats):
+        radius = PET_SIZE / 2
+        world.add(Agent(rng.uniform(radius, screen_width - radius),
+                        rng.uniform(radius, screen_height - radius),
+                        radius=radius, speed=rng.uniform(0.5, 1.5),
+                        wander_angle=rng.uniform(0, 2 * math.pi)))
+    for _ in range(toys):
+        world.add(Agent(rng.uniform(0, screen_width), rng.uniform(0, screen_height),
+                        radius=20.0, speed=0.0, mode=STILL))
+
+
+def main():
+    """Замер шага мира при разном числе объектов с постоянной плотностью"""
+    parser = argparse.ArgumentParser(description="Рулевое управление котов и игрушек")
+    parser.add_argument('--cats', type=int, nargs='+', default=[100, 1000, 5000],
+                        help="количество котов в прогонах")
+    parser.add_argument('--toys', type=float, default=0.5, help="игрушек на кота")
+    parser.add_argument('--ticks', type=int, default=50, help="количество шагов")
+    parser.add_argument('--area', type=float, default=8 * PET_SIZE * PET_SIZE,
+                        help="площадь экрана на одного кота, пикселей")
+    parser.add_argument('--seed', type=int, default=None, help="зерно генератора случайных чисел")
+    args = parser.parse_args()
+
+    for cats in args.cats:
+        rng = random.Random(args.seed)
+        # Экран растёт вместе с числом котов, чтобы плотность не менялась
+        scale = math.sqrt(cats * args.area / (DEFAULT_SCREEN[0] * DEFAULT_SCREEN[1]))
+        world = SteeringWorld((int(DEFAULT_SCREEN[0] * scale), int(DEFAULT_SCREEN[1] * scale)), rng=rng)
+        populate(world, cats, int(cats * args.toys), rng)
+        world.grid.checks = 0
+        started = time.perf_counter()
+        for _ in range(args.ticks):
+            world.step()
+        elapsed = time.perf_counter() - started
+        count = len(world.agents)
+        print(f"{count} объектов: {elapsed / args.ticks * 1000:.2f} мс на шаг, "
+              f"{elapsed / args.ticks / count * 1e6:.1f} мкс на объект, "
+              f"проверок расстояния на объект {world.grid.checks / args.ticks / count:.1f} "
+              f"(попарно было бы {count - 1}), переходов между ячейками {world.grid.moves}, "
+              f"столкновений {world.collisions}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,199 @@
+import argparse
+import time
+from typing import Optional, Tuple
+
+import numpy as np
+
+from behaviors import TRAITS, BehaviorEngine, load_engine
+from simulation import BASE_DT, DEFAULT_SCREEN, FRICTION, PET_SIZE, CatAI
+
+# Столбцы массива черт характера
+TRAIT_COLUMNS = {name: column for column, name in enumerate(TRAITS)}
+
+
+class CatSwarm:
+    """Стая котов в виде структуры массивов NumPy
+
+    Потребности, черты характера, поведения, цели и кинематика всех котов
+    хранятся в массивах, а шаг tick() обновляет всю стаю векторными
+    операциями по тем же правилам, что CatAI и step_physics для одного кота,
+    с теми же таблицами поведений. Смена поведения происходит по сроку,
+    выбранному при входе в поведение.
+    """
+    def __init__(self, count: int, screen_bounds: Tuple[int, int] = DEFAULT_SCREEN,
+                 seed: Optional[int] = None, engine: Optional[BehaviorEngine] = None):
+        self.count = count
+        self.engine = engine = engine or load_engine()
+        self.screen_bounds = screen_bounds
+        self.rng = np.random.default_rng(seed)
+        self.now = 0.0
+
+        # Потребности
+        self.energy = np.full(count, 100.0)
+        self.happiness = np.full(count, 100.0)
+        self.hunger = np.zeros(count)
+
+        # Черты характера
+        self.traits = self.rng.uniform(0.3, 1.0, size=(count, len(TRAITS)))
+
+        # Таблицы поведений
+        self.base_weights = np.array(engine.weights)
+        self.min_duration = np.array(engine.min_duration)
+        self.duration_span = np.array(engine.max_duration) - self.min_duration
+        self.speed = np.array(engine.speed)
+        self.wander = np.array(engine.wander)
+        self.cursor_except = np.array(sorted(engine.cursor_except), dtype=np.int16)
+
+        # Текущее поведение и срок его окончания
+        self.behavior = np.full(count, engine.default, dtype=np.int16)
+        self.deadline = self._draw_deadlines(self.behavior)
+
+        # Цели движения
+        self.target = np.zeros((count, 2))
+        self.has_target = np.zeros(count, dtype=bool)
+
+        # Кинематика
+        screen_width, screen_height = screen_bounds
+        self.position = np.column_stack((
+            self.rng.uniform(0, screen_width - PET_SIZE, count),
+            self.rng.uniform(0, screen_height - PET_SIZE, count),
+        ))
+        self.velocity = np.zeros((count, 2))
+        self.acceleration = np.zeros((count, 2))
+        self.direction = np.ones(count, dtype=np.int8)
+
+    def _draw_deadlines(self, behavior: np.ndarray) -> np.ndarray:
+        """Сроки окончания для поведений behavior, начинающихся сейчас"""
+        spans = self.duration_span[behavior] * self.rng.random(behavior.shape[0])
+        return self.now + self.min_duration[behavior] + spans
+
+    def tick(self, dt: float = BASE_DT, cursor_pos: Optional[Tuple[int, int]] = None) -> None:
+        """Шаг симуляции всей стаи на dt секунд"""
+        self.now += dt
+        self._update_needs(dt)
+
+        due = np.flatnonzero(self.now >= self.deadline)
+        if due.size:
+            self._choose_new_behaviors(due, cursor_pos)
+
+        self._update_physics(dt)
+
+    def _update_needs(self, dt: float) -> None:
+        """Изменение потребностей со временем"""
+        laziness = self.traits[:, TRAIT_COLUMNS['laziness']]
+        np.clip(self.energy - dt * CatAI.ENERGY_DECAY * laziness, 0.0, 100.0, out=self.energy)
+        np.minimum(self.hunger + dt * CatAI.HUNGER_GROWTH, 100.0, out=self.hunger)
+        np.clip(self.happiness - dt * CatAI.HAPPINESS_DECAY, 0.0, 100.0, out=self.happiness)
+
+    def _choose_new_behaviors(self, due: np.ndarray, cursor_pos: Optional[Tuple[int, int]]) -> None:
+        """Выбор новых поведений для котов, у которых истёк срок текущего"""
+        engine = self.engine
+        traits = self.traits[due]
+
+        # Взвешенный выбор с учетом личности и состояния
+        weights = np.broadcast_to(self.base_weights, (due.size, len(engine.names))).copy()
+        for factor in engine.factors:
+            if factor.trait:
+                weights[:, factor.behavior] *= traits[:, TRAIT_COLUMNS[factor.name]]
+            else:
+                share = getattr(self, factor.name)[due] / 100
+                weights[:, factor.behavior] *= 1 - share if factor.inverted else share
+        cumulative = np.cumsum(weights, axis=1)
+        threshold = self.rng.random(due.size) * cumulative[:, -1]
+        new_behavior = np.minimum((cumulative <= threshold[:, None]).sum(axis=1), len(engine.names) - 1)
+        # Новая цель у поведений со случайной целью, выбранных по весам
+        wander = self.wander[new_behavior]
+
+        # Интерес к курсору
+        curious = np.zeros(due.size, dtype=bool)
+        if cursor_pos is not None and engine.cursor_behavior is not None:
+            curious = ((self.rng.random(due.size) < traits[:, TRAIT_COLUMNS[engine.cursor_trait]]) &
+                       ~np.isin(self.behavior[due], self.cursor_except))
+            new_behavior[curious] = engine.cursor_behavior
+
+        # Принудительные состояния на основе потребностей; первое правило важнее,
+        # поэтому правила применяются с конца
+        forced = np.zeros(due.size, dtype=bool)
+        for override in reversed(engine.overrides):
+            need = getattr(self, override.need)[due]
+            hit = need < override.threshold if override.below else need > override.threshold
+            new_behavior[hit] = override.behavior
+            forced |= hit
+        wander &= ~(forced | curious)
+        curious &= ~forced
+
+        # Цели ограничены местом, куда окно кота может встать
+        max_x, max_y = (max(0, size - PET_SIZE) for size in self.screen_bounds)
+        if cursor_pos is not None and curious.any():
+            cats = due[curious]
+            self.target[cats] = (min(max(cursor_pos[0], 0), max_x), min(max(cursor_pos[1], 0), max_y))
+            self.has_target[cats] = True
+        if wander.any():
+            cats = due[wander]
+            self.target[cats, 0] = self.rng.integers(0, max_x, cats.size, endpoint=True)
+            self.target[cats, 1] = self.rng.integers(0, max_y, cats.size, endpoint=True)
+            self.has_target[cats] = True
+
+        self.behavior[due] = new_behavior
+        self.deadline[due] = self._draw_deadlines(new_behavior)
+
+    def _update_physics(self, dt: float) -> None:
+        """Движение к целям с трением и ограничением экраном"""
+        seeking = np.flatnonzero(self.has_target)
+        if seeking.size:
+            delta = self.target[seeking] - self.position[seeking]
+            distance = np.hypot(delta[:, 0], delta[:, 1])
+            moving = distance > 5
+
+            # Достигшие цели останавливаются
+            arrived = seeking[~moving]
+            self.acceleration[arrived] = 0.0
+            self.has_target[arrived] = False
+
+            cats = seeking[moving]
+            direction = delta[moving] / distance[moving, None]
+            speed = self.speed[self.behavior[cats]]
+            self.acceleration[cats] = direction * speed[:, None]
+            self.direction[cats] = np.where(direction[:, 0] > 0, 1, -1)
+
+        # Точное решение покадровой схемы трения, как в integrate
+        frames = dt / BASE_DT
+        decay = FRICTION ** frames
+        friction_sum = FRICTION * (1 - decay) / (1 - FRICTION)
+        terminal = self.acceleration * (BASE_DT * FRICTION / (1 - FRICTION))
+        self.position += friction_sum * self.velocity + terminal * (frames - friction_sum)
+        self.velocity *= decay
+        self.velocity += terminal * (1 - decay)
+
+        # Проверяем границы экрана
+        screen_width, screen_height = self.screen_bounds
+        np.clip(self.position[:, 0], 0, screen_width - PET_SIZE, out=self.position[:, 0])
+        np.clip(self.position[:, 1], 0, screen_height - PET_SIZE, out=self.position[:, 1])
+
+    def behavior_counts(self) -> dict:
+        """Количество котов в каждом поведении"""
+        counts = np.bincount(self.behavior, minlength=len(self.engine.names))
+        return dict(zip(self.engine.names, counts.tolist()))
+
+
+def main():
+    """Замер скорости шага стаи"""
+    parser = argparse.ArgumentParser(description="Симуляция стаи котов")
+    parser.add_argument('--cats', type=int, default=5000, help="количество котов")
+    parser.add_argument('--ticks', type=int, default=1000, help="количество шагов")
+    parser.add_argument('--dt', type=float, default=BASE_DT, help="шаг симуляции в секундах")
+    parser.add_argument('--seed', type=int, default=None, help="зерно генератора случайных чисел")
+    args = parser.parse_args()
+
+    swarm = CatSwarm(args.cats, seed=args.seed)
+    started = time.perf_counter()
+    for _ in range(args.ticks):
+        swarm.tick(args.dt)
+    elapsed = time.perf_counter() - started
+
+    print(f"{args.cats} котов, {args.ticks} шагов: {elapsed / args.ticks * 1000:.3f} мс на шаг")
+    print(swarm.behavior_counts())
+
+
+if __name__ == '__main__':
+    main()